@@ -0,0 +1,58 @@
+import numpy as np
+
+BETA_TYPES = ['fixed', 'variable']
+ANNEALING_SCHEDULES = ['Cauchy', 'linear', 'Boltzmann', 'logarithmic', 'geometric', 'exponential']
+
+# probability of accepting a change with a delta of energy: exp(-beta*delta) if the energy goes up, else 1
+def acceptance_probabilities(beta_value, deltas):
+
+    return np.exp(-beta_value * np.maximum(np.asarray(deltas, dtype=np.float64), 0))
+
+class AnnealingSchedule:
+
+    def __init__(self, beta, beta_type, annealing_schedule, alpha, space_dim, number_steps):
+
+        # the values are checked here to fail before executing any step
+        if beta_type not in BETA_TYPES:
+            raise ValueError('<*> ERROR: Beta type wrong value. Beta type should be variable or fixed but it is', beta_type)
+        if beta_type == 'variable' and annealing_schedule not in ANNEALING_SCHEDULES:
+            raise ValueError('<*> ERROR: Annealing Scheduling wrong value. It should be one of [linear, logarithmic, geometric, exponential] but it is', annealing_schedule)
+
+        self.beta = beta
+        self.beta_type = beta_type
+        self.annealing_schedule = annealing_schedule
+        self.alpha = alpha
+        self.space_dim = space_dim
+
+        # betas[i] is the beta of the iteration i (there is no iteration 0)
+        self.betas = np.array([np.nan] + [self.calculate_beta_value(i) for i in range(1, number_steps+1)])
+
+    def calculate_beta_value(self, i):
+
+        beta_value = 0
+        if self.beta_type == 'fixed':
+            beta_value = self.beta
+        elif self.beta_type == 'variable':
+            if self.annealing_schedule == 'Cauchy' or self.annealing_schedule == 'linear':
+                beta_value = self.beta * i
+            elif self.annealing_schedule == 'Boltzmann' or self.annealing_schedule == 'logarithmic':
+                beta_value = self.beta * np.log(i) + self.beta
+            elif self.annealing_schedule == 'geometric':
+                beta_value = self.beta * self.alpha**(-i+1)
+            elif self.annealing_schedule == 'exponential':
+                beta_value = self.beta * np.exp( self.alpha * (i-1)**(1/self.space_dim) )
+
+        return beta_value
+
+    def get_beta_value(self, i):
+
+        return self.betas[i] if i < len(self.betas) else self.calculate_beta_value(i)
+
+    def calculate_acceptance_table(self, deltas):
+
+        # the deltas are a few different integer values, the acceptance of each (iteration, delta) is calculated only once
+        # table[i, column] is the probability of accepting distinct_deltas[column] in the iteration i
+        distinct_deltas = np.unique(np.asarray(deltas))
+        acceptance_table = acceptance_probabilities(self.betas[:, None], distinct_deltas[None, :])
+
+        return distinct_deltas, acceptance_table
@@ -0,0 +1,60 @@
+import utils
+import benchmark_suite
+import os
+import sys
+import time
+import datetime
+
+
+def main():
+
+    print('\n###################################################################')
+    print('##                    QMS Open Source Software                   ##')
+    print('##                                                               ##')
+    print('##            Benchmarks of all the stages of qms                ##')
+    print('###################################################################\n')
+
+    time_start = time.time()
+
+    #Read config file with the QFold configuration variables
+    config_path = './config/config.json'
+    tools = utils.Utils(config_path)
+
+    args = tools.parse_benchmark_arguments()
+
+    baseline_path = args.baseline if args.baseline != None else tools.config_variables['benchmark_baseline_path']
+    threshold = args.threshold if args.threshold != None else tools.config_variables['benchmark_regression_threshold']
+
+    suite = benchmark_suite.BenchmarkSuite(tools, args.sizes, tools.config_variables['benchmark_seed'], tools.config_variables['benchmark_metropolis_chains'], tools.config_variables['benchmark_repeats'])
+    report = suite.create_report(suite.execute_benchmarks())
+
+    if os.path.dirname(args.output) != '':
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    suite.write_report(report, args.output)
+    print('<i> Benchmark => Results saved in', args.output)
+
+    if args.save_baseline:
+        suite.write_report(report, baseline_path)
+        print('<i> Benchmark => Baseline saved in', baseline_path)
+
+    elif os.path.isfile(baseline_path):
+
+        regressions = suite.compare_with_baseline(report['results'], suite.read_report(baseline_path)['results'], threshold)
+        for regression in regressions:
+            print('<*> REGRESSION:', regression['stage'], regression['metric'], regression['baseline'], '->', regression['current'], '(x' + str(round(regression['ratio'], 2)) + ')')
+
+        print('<i> Benchmark =>', len(regressions), 'regressions greater than', str(round(100*threshold)) + '% compared with', baseline_path)
+
+        # the exit code marks the regressions (it can be used to stop an automatic execution)
+        if len(regressions) > 0:
+            print("<i> Benchmark => Calculated in", str(datetime.timedelta(seconds=time.time() - time_start)), "(hh:mm:ss)")
+            sys.exit(1)
+
+    else:
+        print('<i> Benchmark => There is no baseline in', baseline_path, '(use --save-baseline to create it)')
+
+    print("<i> Benchmark => Calculated in", str(datetime.timedelta(seconds=time.time() - time_start)), "(hh:mm:ss)")
+
+
+if __name__ == '__main__':
+    main()
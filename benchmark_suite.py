@@ -0,0 +1,228 @@
+import json
+import time
+import platform
+import itertools
+import tracemalloc
+import numpy as np
+
+import problem_generator
+import classicalMetropolis
+import vectorizedMetropolis
+import exactMetropolis
+from n_queen_solutions_generator import n_queen_solution_by_n
+
+# the boards of the sequential mode are all the n^n combinations of rows (not only permutations), so they are limited to smaller sizes
+# the oracle has one multicontrolled gate for each delta key, it is only generated for the smallest boards
+MAXIMUM_SIZES = {'sequential': 6, 'oracle': 4}
+
+# engines that are executed with the tables of main.py (energies streamed in blocks, states identified by their rank)
+TABLE_ENGINES = {'iterative': classicalMetropolis.ClassicalMetropolis, 'vectorized': vectorizedMetropolis.VectorizedMetropolis, 'exact': exactMetropolis.ExactMetropolis}
+
+# stages faster than this time (seconds) are not compared with the baseline (the noise is bigger than the change)
+MINIMUM_COMPARABLE_TIME = 0.01
+
+class BenchmarkSuite:
+
+    def __init__(self, tools, sizes, seed, metropolis_chains, repeats):
+
+        self.tools = tools
+        self.sizes = sizes
+        self.seed = seed
+        self.metropolis_chains = metropolis_chains
+        self.repeats = repeats
+
+        # the oracles are always generated (with the oracle cache, only the first repeat would generate them)
+        self.tools.config_variables['oracle_cache'] = False
+
+        # the tables are always calculated (with the tables cache, only the first repeat would calculate them)
+        # the parallel build uses the workers of the config, at least two (the serial build is the other stage)
+        self.tools.config_variables['tables_cache'] = False
+        self.number_workers = max(2, self.tools.config_variables['number_workers'])
+
+        # gate counts and depth of each oracle synthesis (they are not times, they are not compared with the baseline)
+        self.oracle_synthesis = {}
+
+    def execute_benchmarks(self):
+
+        results = {}
+
+        for number_queens in self.sizes:
+
+            results.update(self.execute_stage('n_queen_solution_by_n', 'none', number_queens, lambda: n_queen_solution_by_n(number_queens)))
+
+            for mode in ['swap', 'sequential']:
+
+                if mode == 'sequential' and number_queens > MAXIMUM_SIZES['sequential']:
+                    continue
+
+                # the ranges of the coords are calculated from the energies of each size and mode (the ranges of the previous size are not valid)
+                self.tools.minimum_key_value = []
+                self.tools.maximum_key_value = []
+
+                progen = problem_generator.Problem_generator(number_queens)
+                generate_input = progen.generate_input if mode == 'swap' else lambda: self.generate_sequential_input(progen)
+
+                stage_results, energies = self.measure_stage('generate_input', mode, number_queens, generate_input)
+                results.update(stage_results)
+
+                stage_results, deltas = self.measure_stage('calculateAllDeltasOfRotations', mode, number_queens, lambda: self.tools.calculateAllDeltasOfRotations(energies, False, mode))
+                results.update(stage_results)
+
+                stage_results, counts_dict = self.measure_stage('execute_metropolis', mode, number_queens, lambda: self.execute_metropolis(deltas, mode))
+                results.update(stage_results)
+
+                results.update(self.execute_stage('calculate_tts_from_probability_matrix', mode, number_queens, lambda: self.tools.calculate_tts_from_probability_matrix(counts_dict, deltas['indexes_min_energy'], self.tools.config_variables['precision_solution'])))
+
+                if mode == 'swap' and number_queens <= MAXIMUM_SIZES['oracle']:
+                    results.update(self.execute_stage('generate_oracle', mode, number_queens, lambda: self.generate_oracle(deltas, number_queens)))
+                    self.oracle_synthesis[str(number_queens)] = self.compare_oracle_synthesis(deltas, number_queens)
+
+            results.update(self.execute_table_benchmarks(number_queens))
+
+        return results
+
+    def execute_table_benchmarks(self, number_queens):
+
+        # stages of main.py: the tables are filled with the streamed blocks of energies (serial and parallel) and the engines read the tables
+        results = {}
+        progen = problem_generator.Problem_generator(number_queens)
+
+        stage_results, deltas_tables = self.measure_stage('calculate_streamed_delta_tables', 'tables', number_queens, lambda: self.calculate_delta_tables(progen, 1))
+        results.update(stage_results)
+
+        results.update(self.execute_stage('calculate_streamed_delta_tables_parallel', 'tables', number_queens, lambda: self.calculate_delta_tables(progen, self.number_workers)))
+
+        for engine in TABLE_ENGINES.keys():
+
+            stage_results, counts_dict = self.measure_stage('execute_metropolis_' + engine, 'tables', number_queens, lambda: self.execute_table_metropolis(deltas_tables, engine))
+            results.update(stage_results)
+
+            # the tts of the count arrays of the vectorized engine (the path of the tts of main.py)
+            if engine == 'vectorized':
+                results.update(self.execute_stage('calculate_tts_from_probability_matrix', 'tables', number_queens, lambda: self.tools.calculate_tts_from_probability_matrix(counts_dict, deltas_tables['indexes_min_energy'], self.tools.config_variables['precision_solution'])))
+
+        return results
+
+    def execute_stage(self, stage, mode, number_queens, function):
+
+        return self.measure_stage(stage, mode, number_queens, function)[0]
+
+    def measure_stage(self, stage, mode, number_queens, function):
+
+        print('    ⬤ Benchmark', stage, '(', mode, 'mode,', number_queens, 'queens )')
+
+        # the time is the minimum of some executions without tracing the memory (tracemalloc makes the python code slower)
+        elapsed_time = None
+        for _ in range(self.repeats):
+            np.random.seed(self.seed)
+            time_start = time.perf_counter()
+            result = function()
+            elapsed_time = min(elapsed_time, time.perf_counter() - time_start) if elapsed_time != None else time.perf_counter() - time_start
+
+        # the peak memory is measured in another execution with the same seed
+        np.random.seed(self.seed)
+        tracemalloc.start()
+        function()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        return {stage + '|' + mode + '|' + str(number_queens): {'time': elapsed_time, 'peak_memory': peak_memory}}, result
+
+    def generate_sequential_input(self, progen):
+
+        # each queen can be in any row (the boards with queens in the same row are allowed)
+        problem_desc = {}
+        for board in itertools.product(range(progen.number_queens), repeat=progen.number_queens):
+            key = '-'.join(str(row) for row in board)
+            problem_desc[key] = progen.calculate_eval_value(key)
+
+        return problem_desc
+
+    def execute_metropolis(self, deltas, mode):
+
+        cm = classicalMetropolis.ClassicalMetropolis(deltas['deltas'], self.tools, False, mode, number_workers=1)
+
+        # the number of chains is fixed (the number of iterations of the config grows exponentially with the number of queens)
+        cm.n_iterations = self.metropolis_chains
+
+        return cm.execute_metropolis()
+
+    def calculate_delta_tables(self, progen, number_workers):
+
+        # the tables are calculated with the workers of the config, it is restored after the stage
+        config_number_workers = self.tools.config_variables['number_workers']
+        self.tools.config_variables['number_workers'] = number_workers
+        try:
+            return self.tools.calculate_streamed_delta_tables(progen, False)
+        finally:
+            self.tools.config_variables['number_workers'] = config_number_workers
+
+    def execute_table_metropolis(self, deltas_tables, engine):
+
+        cm = TABLE_ENGINES[engine](deltas_tables, self.tools, False, 'swap', number_workers=1)
+
+        # the same number of chains than the legacy engine (the exact engine propagates the distribution, it does not have chains)
+        cm.n_iterations = self.metropolis_chains
+
+        return cm.execute_metropolis()
+
+    def create_oracle(self, deltas, number_queens):
+
+        # the quantum dependencies are only imported if the oracle is benchmarked
+        from beta_precalc_TruthTableOracle import Beta_precalc_TruthTableOracle
+
+        precision_coords = [int(np.ceil(np.log2(number_queens)))] * number_queens
+        in_bits = int(sum(precision_coords)) + int(np.ceil(np.log2(number_queens))) + 1
+
+        return Beta_precalc_TruthTableOracle(deltas['deltas'], self.tools, in_bits, self.tools.config_variables['ancilla_bits'], precision_coords)
+
+    def generate_oracle(self, deltas, number_queens):
+
+        return self.create_oracle(deltas, number_queens).generate_oracle(self.tools.config_variables['beta_quantum'])
+
+    def compare_oracle_synthesis(self, deltas, number_queens):
+
+        comparison = self.create_oracle(deltas, number_queens).compare_synthesis(self.tools.config_variables['beta_quantum'])
+
+        for synthesis in ['mcx', 'merged']:
+            print('    ⬤ Oracle', synthesis, 'synthesis (', number_queens, 'queens ) => size:', comparison[synthesis]['size'], 'depth:', comparison[synthesis]['depth'])
+
+        if not comparison['is_equivalent']:
+            raise ValueError('<*> ERROR: The oracle synthesis are not equivalent for', number_queens, 'queens')
+
+        return comparison
+
+    def create_report(self, results):
+
+        report = {}
+        report['metadata'] = {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(), 'seed': self.seed, 'metropolis_chains': self.metropolis_chains, 'repeats': self.repeats}
+        report['results'] = results
+        report['oracle_synthesis'] = self.oracle_synthesis
+
+        return report
+
+    def compare_with_baseline(self, results, baseline_results, threshold):
+
+        # a regression is a time or a peak memory greater than the baseline by more than the threshold (relative)
+        regressions = []
+        for key in sorted(set(results.keys()) & set(baseline_results.keys())):
+            for metric in ['time', 'peak_memory']:
+
+                if metric == 'time' and baseline_results[key]['time'] < MINIMUM_COMPARABLE_TIME:
+                    continue
+
+                ratio = results[key][metric] / max(baseline_results[key][metric], 1e-12)
+                if ratio > 1 + threshold:
+                    regressions.append({'stage': key, 'metric': metric, 'baseline': baseline_results[key][metric], 'current': results[key][metric], 'ratio': ratio})
+
+        return regressions
+
+    def write_report(self, report, path):
+
+        with open(path, 'w') as outfile:
+            json.dump(report, outfile, indent=4)
+
+    def read_report(self, path):
+
+        with open(path) as json_file:
+            return json.load(json_file)
@@ -6,9 +6,16 @@ from qiskit import Aer, transpile
 import math
 import numpy as np
 
+from annealing_schedule import acceptance_probabilities
+
+SYNTHESIS_MODES = ['mcx', 'merged']
+
+# gates that are simulated with bits to check the truth table of the oracle (the oracle only contains classical reversible gates before the transpilation)
+CLASSICAL_GATES = ['x', 'cx', 'ccx', 'mcx', 'mcx_gray']
+
 class Beta_precalc_TruthTableOracle():
     '''Outputs the binary coord of rotation to get the correct probability. Tested ok'''
-    def __init__(self, deltas_dictionary, tools, in_bits, out_bits, precision_coords, optimization=False, mct_mode='noancilla'):
+    def __init__(self, deltas_dictionary, tools, in_bits, out_bits, precision_coords, optimization=False, mct_mode='noancilla', synthesis=None, transpile_oracle=None):
 
         self.out_bits = out_bits
         self.deltas_dictionary = OrderedDict(sorted(deltas_dictionary.items()))
@@ -21,6 +28,15 @@ class Beta_precalc_TruthTableOracle():
             for (key, value) in list(self.deltas_dictionary.items()):
                 deltas[key[:-2]+key[-1]] = value
             self.deltas_dictionary = deltas
+
+        # mcx: one multicontrolled gate for each 1 of each coord (all the key is the control)
+        # merged: the keys with the same coord share the controlled gates and they are applied in gray code order
+        self.synthesis = synthesis if synthesis != None else self.tools.config_variables['oracle_synthesis']
+        if self.synthesis not in SYNTHESIS_MODES:
+            raise ValueError('<*> ERROR: The oracle synthesis', self.synthesis, 'is not valid. The valid synthesis are', SYNTHESIS_MODES)
+
+        # the transpilation for the statevector simulator grows with the number of keys, it is only done if it is requested
+        self.transpile_oracle = transpile_oracle if transpile_oracle != None else self.tools.config_variables['oracle_transpile']
         #assert(2**len(list(self.deltas_dictionary.keys())[0]) == len(self.deltas_dictionary))
 
 
@@ -28,7 +44,16 @@ class Beta_precalc_TruthTableOracle():
 
         coords = self.generate_coords_codification(beta)
 
-        oracle_circuit = self.generate_qms_oracle(coords)
+        # the betas with the same quantized coords have the same oracle, it is only generated the first time
+        oracle_cache = self.tools.get_oracle_cache()
+        cache_parameters = {'precision_coords': [int(precision) for precision in self.precision_coords], 'out_bits': self.out_bits, 'synthesis': self.synthesis, 'transpile_oracle': self.transpile_oracle}
+
+        oracle_circuit = oracle_cache.load(coords, cache_parameters) if oracle_cache != None else None
+        if oracle_circuit == None:
+
+            oracle_circuit = self.generate_qms_oracle(coords)
+            if oracle_cache != None:
+                oracle_cache.save(coords, cache_parameters, oracle_circuit)
 
         return oracle_circuit.to_gate(label="oracle")
 
@@ -36,12 +61,11 @@ class Beta_precalc_TruthTableOracle():
 
         coords = {}
 
-        for key in self.deltas_dictionary.keys():
+        # probability of accepting each delta (the same function that is used by the classical metropolis)
+        probabilities = acceptance_probabilities(beta, list(self.deltas_dictionary.values()))
+
+        for key, probability in zip(self.deltas_dictionary.keys(), probabilities.tolist()):
 
-            if self.deltas_dictionary[key] >= 0:
-                probability = math.exp(-beta * self.deltas_dictionary[key])
-            else: 
-                probability = 1
             # Instead of encoding the coord corresponding to the probability, we will encode the coord theta such that sin^2(pi/2 - theta) = probability.
             # That way 1 -> 000, but if probability is 0 there is some small probability of acceptance
             
@@ -69,6 +93,20 @@ class Beta_precalc_TruthTableOracle():
 
     def generate_qms_oracle(self, coords):
 
+        if self.synthesis == 'mcx':
+            oracle_circuit = self.synthesize_mcx_oracle(coords)
+        elif self.synthesis == 'merged':
+            oracle_circuit = self.synthesize_merged_oracle(coords)
+
+        self.circuit_statistics = self.calculate_circuit_statistics(oracle_circuit)
+
+        if self.transpile_oracle:
+            oracle_circuit = transpile(oracle_circuit, Aer.get_backend('statevector_simulator'))
+
+        return oracle_circuit
+
+    def create_oracle_circuit(self, coords):
+
         # calculate the length in binary of oracle key
         len_oracle_key = int(sum(self.precision_coords)) + int(math.ceil(np.log2(len(self.precision_coords)))) + 1
         if len(self.precision_coords) == 0: len_oracle_key += 1
@@ -77,9 +115,13 @@ class Beta_precalc_TruthTableOracle():
         oracle_value = QuantumRegister(len(list(coords.values())[0]), name='oracle_value')
 
         # create a quantum circuit with the same length than the key of the deltas energies
-        oracle_circuit = QuantumCircuit(oracle_key, oracle_value)
+        return QuantumCircuit(oracle_key, oracle_value), oracle_key, oracle_value
+
+    def synthesize_mcx_oracle(self, coords):
 
-        for key in self.coords.keys():
+        oracle_circuit, oracle_key, oracle_value = self.create_oracle_circuit(coords)
+
+        for key in coords.keys():
             
             if '1' in coords[key]:
 
@@ -97,7 +139,143 @@ class Beta_precalc_TruthTableOracle():
                 # apply x gates to the 0s in the binary_key
                 self.tools.execute_x_multiple_register(oracle_circuit, oracle_key, '0', binary_key, 'backward')
 
-        return transpile(oracle_circuit, Aer.get_backend('statevector_simulator'))
+        return oracle_circuit
+
+    def synthesize_merged_oracle(self, coords):
+
+        oracle_circuit, oracle_key, oracle_value = self.create_oracle_circuit(coords)
+
+        # the keys with the same coord are a group (the coords with only 0s do not change the value register)
+        groups = {}
+        for key, coord in coords.items():
+            if '1' in coord:
+                groups.setdefault(coord, []).append(self.key_to_binary(key))
+
+        # the x gates of the 0s of the key are not undone after each key, they are only changed when the next key needs it
+        # (the bit of the position i of the binary key is the qubit len-1-i, like in execute_x_multiple_register with 'backward')
+        flipped = [False] * len(oracle_key)
+
+        for coord in sorted(groups.keys()):
+
+            # the value qubits of the 1s of the coord: the first one is the target of the controlled gates and it is copied to the others
+            # (the others are xored with the target before and after the gates, so they end xored with the same function)
+            targets = [coord_bit_index for coord_bit_index in range(len(coord)) if coord[(len(coord)-1) - coord_bit_index] == '1']
+            for target in targets[1:]:
+                oracle_circuit.cx(oracle_value[targets[0]], oracle_value[target])
+
+            for cube in self.merge_binary_keys(groups[coord]):
+
+                for position, bit in enumerate(cube):
+                    if bit != '-' and flipped[position] != (bit == '0'):
+                        oracle_circuit.x(oracle_key[len(cube)-1 - position])
+                        flipped[position] = bit == '0'
+
+                # the positions with '-' are not controls (the cube contains the keys with both values in that position)
+                controls = [oracle_key[len(cube)-1 - position] for position, bit in enumerate(cube) if bit != '-']
+                if len(controls) > 0:
+                    oracle_circuit.mcx(controls, oracle_value[targets[0]])
+                else:
+                    oracle_circuit.x(oracle_value[targets[0]])
+
+            for target in targets[1:]:
+                oracle_circuit.cx(oracle_value[targets[0]], oracle_value[target])
+
+        for position in range(len(flipped)):
+            if flipped[position]:
+                oracle_circuit.x(oracle_key[len(flipped)-1 - position])
+
+        return oracle_circuit
+
+    def merge_binary_keys(self, binary_keys):
+
+        # two cubes that only differ in one bit are merged in one cube with '-' in that bit (one control less)
+        # each cube is merged once in each round, so the cubes are always disjoint and each key is in exactly one cube
+        cubes = sorted(set(binary_keys))
+        is_merged = True
+        while is_merged:
+
+            is_merged = False
+            remaining_cubes = set(cubes)
+            merged_cubes = []
+
+            for cube in cubes:
+
+                if cube not in remaining_cubes:
+                    continue
+                remaining_cubes.remove(cube)
+
+                for position in range(len(cube)):
+                    if cube[position] == '-':
+                        continue
+
+                    partner = cube[:position] + ('1' if cube[position] == '0' else '0') + cube[position+1:]
+                    if partner in remaining_cubes:
+                        remaining_cubes.remove(partner)
+                        cube = cube[:position] + '-' + cube[position+1:]
+                        is_merged = True
+                        break
+
+                merged_cubes.append(cube)
+
+            cubes = sorted(merged_cubes)
+
+        # in gray code order, consecutive cubes differ in few bits, so few x gates are necessary between them
+        return sorted(cubes, key=lambda cube: int(gray_to_bin(cube.replace('-', '0')), 2))
+
+    def calculate_circuit_statistics(self, circuit):
+
+        statistics = {}
+        statistics['size'] = circuit.size()
+        statistics['depth'] = circuit.depth()
+        statistics['operations'] = dict(circuit.count_ops())
+
+        return statistics
+
+    def calculate_truth_table(self, circuit):
+
+        # the oracle is simulated with bits for all the keys (with the value register initialized to 0)
+        # the result is the value of each key, the key register must be restored by the oracle
+        number_key_qubits = circuit.qregs[0].size
+        keys = np.arange(2**number_key_qubits)
+
+        bits = np.zeros((len(keys), circuit.num_qubits), dtype=bool)
+        bits[:, :number_key_qubits] = (keys[:, None] >> np.arange(number_key_qubits)) & 1
+
+        for instruction in circuit.data:
+
+            name = instruction.operation.name
+            if name not in CLASSICAL_GATES:
+                raise ValueError('<*> ERROR: The gate', name, 'can not be simulated with bits (the truth table is calculated before the transpilation)')
+
+            qubits = [circuit.find_bit(qubit).index for qubit in instruction.qubits]
+            control_state = instruction.operation.ctrl_state if name != 'x' else 0
+            controls_active = np.ones(len(keys), dtype=bool)
+            for control_index, qubit in enumerate(qubits[:-1]):
+                controls_active &= bits[:, qubit] == bool((control_state >> control_index) & 1)
+
+            bits[:, qubits[-1]] ^= controls_active
+
+        if (bits[:, :number_key_qubits] != ((keys[:, None] >> np.arange(number_key_qubits)) & 1)).any():
+            raise ValueError('<*> ERROR: The oracle does not restore the key register')
+
+        return bits[:, number_key_qubits:] @ (1 << np.arange(circuit.num_qubits - number_key_qubits))
+
+    def compare_synthesis(self, beta):
+
+        # the circuits of all synthesis are compared before the transpilation (gate counts, depth and truth table)
+        coords = self.generate_coords_codification(beta)
+
+        comparison = {}
+        truth_tables = {}
+        for synthesis in SYNTHESIS_MODES:
+
+            circuit = self.synthesize_mcx_oracle(coords) if synthesis == 'mcx' else self.synthesize_merged_oracle(coords)
+            comparison[synthesis] = self.calculate_circuit_statistics(circuit)
+            truth_tables[synthesis] = self.calculate_truth_table(circuit)
+
+        comparison['is_equivalent'] = all(np.array_equal(truth_tables['mcx'], truth_tables[synthesis]) for synthesis in SYNTHESIS_MODES)
+
+        return comparison
 
     # convert the interger key of the deltas dict in binary key
     # format of deltas key coord1-coord2-coord3-...|id(integer)|plusminus
@@ -1,15 +1,29 @@
 import numpy as np
 import copy
-import math
 import statistics
 import time
 import datetime
+from collections import Counter, defaultdict
 
 from sympy import false, true
 
+from annealing_schedule import AnnealingSchedule
+from permutation_space import PermutationSpace
+from shared_tables import SharedTables
+import worker_pool
+
+def count_worker_shard(n_chains, seed):
+
+    # the counters of the worker are returned with the counts (the engine of the worker is a copy, its counters are lost)
+    worker_metropolis = worker_pool.get_worker_object()
+    worker_metropolis.step_counters = defaultdict(Counter)
+    counts = worker_metropolis.count_metropolis_shard(n_chains, seed)
+
+    return counts, worker_metropolis.step_counters
+
 class ClassicalMetropolis():
 
-    def __init__(self, deltas_dict, tools, is_circular, successor_generation_mode):
+    def __init__(self, deltas, tools, is_circular, successor_generation_mode, number_workers=None):
 
         self.tools = tools
         self.is_circular = is_circular
@@ -22,52 +36,210 @@ class ClassicalMetropolis():
         self.annealing_schedule = self.tools.config_variables['annealing_schedule']
         self.initial_step = self.tools.config_variables['initial_step']
         self.final_step = self.tools.config_variables['final_step']
+        self.step_sweep = self.tools.config_variables['step_sweep']
+        self.number_workers = number_workers if number_workers != None else self.tools.config_variables['number_workers']
 
         self.minimum_coord_value = self.tools.minimum_key_value
         self.maximum_coord_value = self.tools.maximum_key_value
 
-        self.deltas_dict = deltas_dict
+        # the deltas are the tables indexed by the rank of the permutations (the chains are states) or a dict with string keys
+        # (energies given as a dict, the chains are coords). The engines with their own tables do not give the deltas
+        self.is_tables = deltas != None and 'permutation_space' in deltas
+        if self.is_tables:
+            self.load_tables(deltas)
+            self.state_space = deltas['permutation_space']
+            self.deltas_dict = None
+        else:
+            self.deltas_dict = deltas
+
         self.number_coordinates = self.tools.number_coordinates
 
+        # tables published in shared memory while there are worker processes (see share_tables)
+        self.shared_tables = None
+
+        # proposals, acceptances, rejections, invalid move retries and delta lookups of the chains of each step
+        # in sweep mode one chain covers all steps, so all its proposals are counted in the final step
+        self.step_counters = defaultdict(Counter)
+        self.invalid_move_retries = 0
+
         # calculate the number of iterations based on the mean number of steps in the coordinate groups
         mean_coords_difference = statistics.mean([value[1] - value[0] for value in zip(self.minimum_coord_value, self.maximum_coord_value)])
         self.n_iterations = int(self.tools.config_variables['number_iterations'] * (mean_coords_difference ** self.number_coordinates))
 
+        # in swap mode, probability of proposing each move 2*coord + plusminus (the moves of the fixed queen have probability 0)
+        if self.successor_generation_mode == 'swap':
+            self.permutation_space = PermutationSpace(self.number_coordinates)
+            self.move_probabilities = self.permutation_space.calculate_move_probabilities(self.tools.fixed_position_queen[0])
+
+        # the betas of all iterations are calculated once (a wrong schedule raises an error here, not in the middle of the execution)
+        self.schedule = AnnealingSchedule(self.beta, self.beta_type, self.annealing_schedule, self.alpha, self.number_coordinates, self.final_step)
+        self.prepare_acceptance_table()
+
     def execute_metropolis(self):
 
-        probabilities_matrix_dict = {}
+        if self.number_workers > 1:
+            return self.execute_metropolis_parallel()
+
+        # in sweep mode each chain is executed only once until the final step and its state is saved at each step
+        # a chain of step k is a prefix of the chain of step k+1 because the beta of the iteration i only depends on i (not on the number of steps)
+        if self.step_sweep:
+            return self.execute_metropolis_sweep()
+
+        # the result of each step is the number of times that each coord was produced (the probabilities are count / n_iterations)
+        counts_dict = {}
 
         for step in range(self.initial_step, self.final_step+1):
             
             time_start = time.time()
+            cpu_start = time.process_time()
 
-            probabilities_matrix = {}
+            counts = Counter()
     
             for _ in range(self.n_iterations):
                 
                 coords = self.calculate_metropolis_result(step)
-            
-                # it is necessary to construct the key from the received coords (from the classical metropolis)
-                # the idea is to add 1/n_repetitions to the returned value (to get the normalized number of times that this coord was produced)
-                position_coords = ''
-                for index in range(len(coords)): position_coords += str(coords[index]) + '-'
-                position_coords = position_coords[:-1]
+                counts[self.get_count_key(coords)] += 1
 
-                # if the is already created, sum the entry to the dict, else create the entry
-                if position_coords in probabilities_matrix.keys():
-                    probabilities_matrix[position_coords] += (1/self.n_iterations) 
-                else:
-                    probabilities_matrix[position_coords] = (1/self.n_iterations)
-
-            probabilities_matrix_dict[step] = probabilities_matrix
+            counts_dict[step] = counts
 
+            self.record_step_time(step, time_start, cpu_start)
             print("<i> Classical Metropolis => Step", step, "calculated in", str(datetime.timedelta(seconds=time.time() - time_start)), "(hh:mm:ss)")
         
-        return probabilities_matrix_dict
+        return counts_dict
+
+    def execute_metropolis_sweep(self):
+
+        time_start = time.time()
+
+        counts_dict = self.count_metropolis_shard(self.n_iterations)
+
+        print("<i> Classical Metropolis => Steps", self.initial_step, "to", self.final_step, "calculated in", str(datetime.timedelta(seconds=time.time() - time_start)), "(hh:mm:ss)")
+
+        return counts_dict
+
+    def execute_metropolis_parallel(self):
+
+        time_start = time.time()
+
+        # the chains are divided between the workers, each worker uses a different seed to generate independent chains
+        # the seeds are spawned from the global generator, so a seeded execution (-s/--seed) gives the same results with workers
+        shard_sizes = [self.n_iterations // self.number_workers + (1 if worker < self.n_iterations % self.number_workers else 0) for worker in range(self.number_workers)]
+        seeds = [int(seed.generate_state(1)[0]) for seed in np.random.SeedSequence(np.random.randint(2**32)).spawn(self.number_workers)]
+
+        # the tables are published once in shared memory, the workers receive the engine without them and attach the same memory
+        self.share_tables()
+        try:
+            with worker_pool.create_pool(self.number_workers, self) as pool:
+                shard_results = pool.starmap(count_worker_shard, zip(shard_sizes, seeds))
+        finally:
+            self.release_tables()
+
+        # each worker returns the number of times that each state was produced in each step, the counts are merged adding them
+        counts = shard_results[0][0]
+        for shard, _ in shard_results[1:]:
+            for step in counts.keys():
+                counts[step] += shard[step]
+
+        for _, shard_step_counters in shard_results:
+            for step, counters in shard_step_counters.items():
+                self.step_counters[step].update(counters)
+
+        print("<i> Classical Metropolis => Steps", self.initial_step, "to", self.final_step, "calculated with", self.number_workers, "workers in", str(datetime.timedelta(seconds=time.time() - time_start)), "(hh:mm:ss)")
+
+        return counts
+
+    def record_step_time(self, step, time_start, cpu_start):
+
+        self.tools.metrics.add_step(type(self).__name__, step, {'wall_time': time.time() - time_start, 'cpu_time': time.process_time() - cpu_start})
+
+    def report_metrics(self):
+
+        for step, counters in self.step_counters.items():
+            self.tools.metrics.add_step(type(self).__name__, step, counters)
+
+    # names of the array attributes that are shared with the workers (the deltas dict of this engine is sent to each worker)
+    def get_shared_table_names(self):
+
+        return ['deltas', 'successors'] if self.is_tables else []
+
+    def share_tables(self):
+
+        self.shared_tables = SharedTables({name: getattr(self, name) for name in self.get_shared_table_names()})
+
+    def release_tables(self):
+
+        self.shared_tables.release()
+        self.shared_tables = None
+
+    def __getstate__(self):
+
+        # the shared tables are not pickled, only the names of the shared memory blocks
+        state = self.__dict__.copy()
+        if self.shared_tables != None:
+            for name in self.shared_tables.descriptions.keys():
+                del state[name]
+
+        return state
+
+    def __setstate__(self, state):
+
+        self.__dict__.update(state)
+        if self.shared_tables != None:
+            self.__dict__.update(self.shared_tables.attach())
+
+    def count_metropolis_shard(self, n_chains, seed=None):
+
+        if seed != None: np.random.seed(seed)
+
+        steps = list(range(self.initial_step, self.final_step+1))
+        counts = {step: Counter() for step in steps}
+
+        for _ in range(n_chains):
+
+            if self.step_sweep:
+                coords_by_step = self.calculate_metropolis_result(self.final_step, record_steps=steps)
+            else:
+                coords_by_step = {step: self.calculate_metropolis_result(step) for step in steps}
 
-    def calculate_metropolis_result(self, nW, fixed_coords=[]):
+            for step in steps:
+                counts[step][self.get_count_key(coords_by_step[step])] += 1
+
+        return counts
+
+    def load_tables(self, deltas_tables):
+
+        # each state is the Lehmer rank of a permutation, the moves are 2*coord + plusminus
+        self.deltas = deltas_tables['deltas']
+        self.successors = deltas_tables['successors']
+        self.number_states = len(self.deltas)
+
+    def calculate_valid_states(self, deltas_tables):
+
+        # states where the fixed queen is in its position (all states are valid if there is no fixed queen)
+        if self.tools.fixed_position_queen[0] == -1:
+            self.valid_states = np.ones(self.number_states, dtype=bool)
+        else:
+            permutations = deltas_tables['permutation_space'].all_permutations()
+            self.valid_states = permutations[:, self.tools.fixed_position_queen[0]] == self.tools.fixed_position_queen[1]
+
+    def get_count_key(self, result):
+
+        # the results of the tables are the states, the results of the deltas dict are coords
+        return result if self.is_tables else self.coords_to_key(result)
+
+    def coords_to_key(self, coords):
+
+        # it is necessary to construct the key from the received coords (from the classical metropolis)
+        position_coords = ''
+        for index in range(len(coords)): position_coords += str(coords[index]) + '-'
+
+        return position_coords[:-1]
+
+    def calculate_metropolis_result(self, nW, fixed_coords=[], record_steps=None):
 
         #Final structure calculated with metropolis.
+        if self.is_tables:
+            return self.calculate_metropolis_state(nW, record_steps=record_steps)
 
         # Data structure with the rotatation (0-rotation steps) of each coordinate
         # for example, if there are 3 groups of coordinates, it is necessary to store three positions
@@ -82,17 +254,8 @@ class ClassicalMetropolis():
                     coords_old = np.random.randint(self.minimum_coord_value, self.maximum_coord_value) # generate a initial random vector of coordinates
                 elif self.successor_generation_mode == 'swap':
 
-                    coords_old = []
-
-                    for index in range(len(self.minimum_coord_value)):
-                    
-                        # generate a random value between the minimum and maximum value for each coord
-                        random_candidate = np.random.randint(self.minimum_coord_value[index], self.maximum_coord_value[index]+1)
-                        # repeat until the random candidate is not in the list
-                        while(random_candidate in coords_old):
-                            random_candidate = np.random.randint(self.minimum_coord_value[index], self.maximum_coord_value[index]+1)
-
-                        coords_old.append(random_candidate)
+                    # the random permutation is generated with the fixed queen in its position (it is never repeated)
+                    coords_old = self.permutation_space.random_permutations(1, self.tools.fixed_position_queen[0], self.tools.fixed_position_queen[1])[0].tolist()
                 
                 if self.tools.fixed_position_queen[0] == -1 or coords_old[self.tools.fixed_position_queen[0]] == self.tools.fixed_position_queen[1]:
                     valid_coord = true
@@ -100,41 +263,27 @@ class ClassicalMetropolis():
         elif self.initialization == 'fixed':
             coords_old = fixed_coords
 
+        # if record_steps is defined, the coords of these steps are returned (it is necessary to copy them because coords_old changes)
+        coords_by_step = {}
+        if record_steps != None and 0 in record_steps: coords_by_step[0] = copy.deepcopy(coords_old)
+
+        acceptances = 0
+
         for i in range(1, nW+1):
 
             coords_new, change_coord, change_plus_minus = self.generate_new_coords(coords_old)
 
             # This choice of Delta_E seems weird.
             # Correspondingly: (state = coord...) +  (move_id = coord +  position_coord) +  move_value
-            beta_value = 0
-            if self.beta_type == 'fixed':
-                beta_value = self.beta
-            elif self.beta_type == 'variable':
-                if self.annealing_schedule == 'Cauchy' or self.annealing_schedule == 'linear':
-                    beta_value = self.beta * i 
-                elif self.annealing_schedule == 'Boltzmann' or self.annealing_schedule == 'logarithmic':
-                    beta_value = self.beta * np.log(i) + self.beta
-                elif self.annealing_schedule == 'geometric':
-                    beta_value = self.beta * self.alpha**(-i+1)
-                elif self.annealing_schedule == 'exponential': 
-                    space_dim = self.number_coordinates
-                    beta_value = self.beta * np.exp( self.alpha * (i-1)**(1/space_dim) )
-                else:
-                    raise ValueError('<*> ERROR: Annealing Scheduling wrong value. It should be one of [linear, logarithmic, geometric, exponential] but it is', self.annealing_schedule)
-            else:
-                ValueError('<*> ERROR: Beta type wrong value. Beta type should be variable or fixed but it is', self.beta_type)
-
             # convert coords_old to string and add a '-' between coords. Then remove last '-' (it is unnecessary)
             # add the change coord and change_plus_minus separated by |
             # if there is only one energy group, the key does not include the change_coord, if there is more than one energy group, include change_coord
             if self.number_coordinates == 1: key = ''.join(str(c)+'-' for c in coords_old)[:-1] + '|' + str(change_plus_minus)
             else: key = ''.join(str(c)+'-' for c in coords_old)[:-1] + '|' + str(change_coord) + '|' + str(change_plus_minus)
 
+            # the probability exp(-beta*Delta_E) (or 1 if the energy goes down) is precalculated for each iteration and delta
             Delta_E = self.deltas_dict[key]
-            if Delta_E >= 0:
-                probability_threshold = math.exp(-beta_value * Delta_E)
-            else:
-                probability_threshold = 1
+            probability_threshold = self.acceptance_table[i, self.delta_columns[Delta_E]]
 
             random_number = np.random.random_sample()
 
@@ -142,9 +291,65 @@ class ClassicalMetropolis():
             # If beta small, np.exp(-beta*Delta_E) approx 1.
             if random_number < min(1,probability_threshold): # Accept the change
                 coords_old = copy.deepcopy(coords_new)
+                acceptances += 1
+
+            if record_steps != None and i in record_steps: coords_by_step[i] = copy.deepcopy(coords_old)
+
+        # each proposal is one lookup in the deltas dict
+        self.step_counters[nW].update({'proposals': nW, 'acceptances': acceptances, 'rejections': nW - acceptances, 'delta_lookups': nW, 'invalid_move_retries': self.invalid_move_retries})
+        self.invalid_move_retries = 0
+
+        if record_steps != None: return coords_by_step
 
         return coords_old
+
+    def calculate_metropolis_state(self, nW, fixed_state=0, record_steps=None):
+
+        # the same chain than calculate_metropolis_result with the tables: the state is the rank of the coords,
+        # the delta of each move is read from the deltas table and the new state from the successors table (the coords are not copied)
+        if self.initialization == 'random':
+            state_old = self.state_space.rank(self.permutation_space.random_permutations(1, self.tools.fixed_position_queen[0], self.tools.fixed_position_queen[1])[0])
+        elif self.initialization == 'fixed':
+            state_old = fixed_state
+
+        states_by_step = {}
+        if record_steps != None and 0 in record_steps: states_by_step[0] = state_old
+
+        acceptances = 0
+
+        for i in range(1, nW+1):
+
+            # the move 2*coord + plusminus is chosen between the legal moves (the same proposal than generate_new_coords in swap mode)
+            move = np.random.choice(len(self.move_probabilities), p=self.move_probabilities)
+
+            Delta_E = self.deltas[state_old, move]
+            probability_threshold = self.acceptance_table[i, self.delta_columns[Delta_E]]
+
+            random_number = np.random.random_sample()
+
+            if random_number < min(1,probability_threshold): # Accept the change
+                state_old = int(self.successors[state_old, move])
+                acceptances += 1
+
+            if record_steps != None and i in record_steps: states_by_step[i] = state_old
+
+        # each proposal is one lookup in the deltas table (the moves of the fixed queen are never proposed, there are no retries)
+        self.step_counters[nW].update({'proposals': nW, 'acceptances': acceptances, 'rejections': nW - acceptances, 'delta_lookups': nW, 'invalid_move_retries': 0})
+
+        if record_steps != None: return states_by_step
+
+        return state_old
     
+    def calculate_beta_value(self, i):
+
+        return self.schedule.get_beta_value(i)
+
+    def prepare_acceptance_table(self):
+
+        # probability of accepting each different delta in each iteration (it is not necessary to calculate exp in each proposal)
+        distinct_deltas, self.acceptance_table = self.schedule.calculate_acceptance_table(self.deltas if self.is_tables else list(set(self.deltas_dict.values())))
+        self.delta_columns = {delta: column for column, delta in enumerate(distinct_deltas.tolist())}
+
     def generate_new_coords(self, coords_old):
 
         valid_coord = false
@@ -154,11 +359,14 @@ class ClassicalMetropolis():
             # deep copy is necessary to avoid two pointer to the same data structure (it is necessary only to modify one of the arrays)
             coords_new = copy.deepcopy(coords_old)
         
-            # propose a change in one coord
-            coord_change = np.random.choice(self.number_coordinates)
-
-            # 0 = 1 | 1 = -1
-            change_plus_minus = np.random.choice((0,1))
+            # propose a change in one coord. 0 = 1 | 1 = -1
+            # in swap mode the move is chosen between the legal moves (the fixed queen is never moved, so it is not repeated)
+            if self.successor_generation_mode == 'swap':
+                move = np.random.choice(len(self.move_probabilities), p=self.move_probabilities)
+                coord_change, change_plus_minus = move // 2, move % 2
+            else:
+                coord_change = np.random.choice(self.number_coordinates)
+                change_plus_minus = np.random.choice((0,1))
             pm = -2*change_plus_minus + 1
 
             # new coord in sequential mode is just to add pm to the new coord (that it is a copy of the previous coord)
@@ -185,5 +393,7 @@ class ClassicalMetropolis():
 
             if self.tools.fixed_position_queen[0] == -1 or coords_new[self.tools.fixed_position_queen[0]] == self.tools.fixed_position_queen[1]:
                 valid_coord = true
+            else:
+                self.invalid_move_retries += 1
 
         return coords_new, coord_change, change_plus_minus
\ No newline at end of file
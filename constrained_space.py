@@ -0,0 +1,83 @@
+import math
+import numpy as np
+
+from permutation_space import PermutationSpace
+
+class ConstrainedSpace:
+
+    # permutations of n elements with one element in a fixed position (the fixed queen): (n-1)! states instead of n!
+    # the states are numbered 0..(n-1)!-1 following the order of their ranks in the complete space
+    def __init__(self, number_elements, fixed_position, fixed_element):
+
+        self.number_elements = number_elements
+        self.fixed_position = fixed_position
+        self.fixed_element = fixed_element
+        self.size = math.factorial(number_elements-1)
+
+        self.complete_space = PermutationSpace(number_elements)
+        self.rank_dtype = self.complete_space.rank_dtype
+
+        # rank in the complete space of each state (the insertion of the fixed element keeps the lexicographic order, so they are sorted)
+        self.complete_ranks = self.complete_space.rank_array(self.all_permutations())
+
+    def all_permutations(self):
+
+        elements = np.array([element for element in range(self.number_elements) if element != self.fixed_element], dtype=np.int8)
+        permutations = elements[PermutationSpace(self.number_elements-1).all_permutations()]
+
+        return np.insert(permutations, self.fixed_position, self.fixed_element, axis=1)
+
+    def permutation_blocks(self, block_size, partition=None):
+
+        # the blocks of consecutive states are the blocks of the permutations of the other elements with the fixed element inserted
+        # (the partitions are the partitions of the permutations of the other elements)
+        elements = np.array([element for element in range(self.number_elements) if element != self.fixed_element], dtype=np.int8)
+
+        for first_rank, permutations in PermutationSpace(self.number_elements-1).permutation_blocks(block_size, partition):
+            yield first_rank, np.insert(elements[permutations], self.fixed_position, self.fixed_element, axis=1)
+
+    def number_partitions(self):
+
+        return self.number_elements-1
+
+    def from_complete_ranks(self, complete_ranks):
+
+        return np.searchsorted(self.complete_ranks, complete_ranks).astype(self.rank_dtype)
+
+    def lehmer_codes(self, permutations):
+
+        return self.complete_space.lehmer_codes(permutations)
+
+    def rank_array(self, permutations):
+
+        return self.from_complete_ranks(self.complete_space.rank_array(permutations))
+
+    def unrank_array(self, ranks):
+
+        return self.complete_space.unrank_array(self.complete_ranks[ranks])
+
+    def rank(self, permutation):
+
+        return int(self.rank_array(np.array(permutation))[0])
+
+    def unrank(self, rank):
+
+        return self.unrank_array([rank])[0].tolist()
+
+    def swap_positions(self):
+
+        # the exchanges of the fixed position would leave the space
+        return [position for position in self.complete_space.swap_positions() if self.fixed_position not in [position, position+1]]
+
+    def adjacent_swap_ranks(self, ranks, codes, permutations, position):
+
+        # the exchange is calculated in the complete space and the result is mapped to the states of this space
+        return self.from_complete_ranks(self.complete_space.adjacent_swap_ranks(self.complete_ranks[ranks], codes, permutations, position))
+
+    def key(self, rank):
+
+        return '-'.join(str(element) for element in self.unrank(rank))
+
+    def rank_of_key(self, key):
+
+        return self.rank(list(map(int, key.split('-'))))
@@ -0,0 +1,77 @@
+import numpy as np
+import time
+import datetime
+from scipy import sparse
+
+from classicalMetropolis import ClassicalMetropolis
+from annealing_schedule import acceptance_probabilities
+
+class ExactMetropolis(ClassicalMetropolis):
+
+    def __init__(self, deltas_tables, tools, is_circular, successor_generation_mode, number_workers=None):
+
+        self.load_tables(deltas_tables)
+
+        # the deltas dict of the iterative engine is not used, the tables are attributes of this engine
+        super().__init__(None, tools, is_circular, successor_generation_mode, number_workers)
+
+        if self.successor_generation_mode != 'swap':
+            raise ValueError('<*> ERROR: Exact Metropolis only supports permutation problems (swap mode) but the mode is', self.successor_generation_mode)
+
+        self.calculate_valid_states(deltas_tables)
+
+        # one transition matrix for each different beta value
+        self.transition_matrices = {}
+
+    def prepare_acceptance_table(self):
+
+        # the acceptance of all deltas is calculated when the transition matrix of each beta is created
+        pass
+
+    def get_transition_matrix(self, beta_value):
+
+        if beta_value not in self.transition_matrices:
+
+            # probability of going from a state to each successor: probability of the move * probability of accepting it
+            # the rejected moves (and the moves with probability 0) keep the chain in the same state
+            transitions = acceptance_probabilities(beta_value, self.deltas) * self.move_probabilities
+
+            states = np.repeat(np.arange(self.number_states), self.successors.shape[1])
+            transition_matrix = sparse.csr_matrix((transitions.ravel(), (states, np.asarray(self.successors).ravel())), shape=(self.number_states, self.number_states))
+            transition_matrix = transition_matrix + sparse.diags(1 - transitions.sum(axis=1))
+
+            # the distribution is propagated multiplying by the transposed matrix (column vector)
+            self.transition_matrices[beta_value] = transition_matrix.T.tocsr()
+
+        return self.transition_matrices[beta_value]
+
+    def calculate_initial_distribution(self, fixed_state=0):
+
+        # uniform in all valid states (random initialization) or all the probability in the fixed state
+        if self.initialization == 'random':
+            return self.valid_states / self.valid_states.sum()
+
+        distribution = np.zeros(self.number_states)
+        distribution[fixed_state] = 1
+
+        return distribution
+
+    def execute_metropolis(self, fixed_state=0):
+
+        time_start = time.time()
+
+        distribution = self.calculate_initial_distribution(fixed_state)
+
+        # the result of each step is the exact probability of each state (an array indexed by state id like the count histograms)
+        probabilities_dict = {}
+        if self.initial_step == 0: probabilities_dict[0] = distribution
+
+        for i in range(1, self.final_step+1):
+
+            distribution = self.get_transition_matrix(self.calculate_beta_value(i)) @ distribution
+
+            if i >= self.initial_step: probabilities_dict[i] = distribution
+
+        print("<i> Exact Metropolis => Steps", self.initial_step, "to", self.final_step, "calculated in", str(datetime.timedelta(seconds=time.time() - time_start)), "(hh:mm:ss)")
+
+        return probabilities_dict
@@ -0,0 +1,64 @@
+import numpy as np
+
+class IncrementalDeltaEvaluator:
+
+    def __init__(self, number_queens):
+
+        self.number_queens = number_queens
+
+        # the queen of the column c in the row r is in the top diagonal r+c and in the bottom diagonal r-c+n-1
+        self.number_diagonals = 2*number_queens - 1
+        self.columns = np.arange(number_queens)
+
+    def diagonal_counts(self, permutations):
+
+        # number of queens in each top and bottom diagonal of each board (one board per row)
+        permutations = np.asarray(permutations, dtype=np.int64)
+        board_offsets = (np.arange(len(permutations)) * self.number_diagonals)[:, None]
+
+        top_counts = np.bincount((permutations + self.columns + board_offsets).ravel(), minlength=len(permutations)*self.number_diagonals)
+        bot_counts = np.bincount((permutations - self.columns + self.number_queens-1 + board_offsets).ravel(), minlength=len(permutations)*self.number_diagonals)
+
+        return top_counts.reshape(-1, self.number_diagonals), bot_counts.reshape(-1, self.number_diagonals)
+
+    def energies_from_counts(self, top_counts, bot_counts):
+
+        # in calculate_eval_value each queen of a diagonal with m queens adds 1, 1+1, 1+2, ... for the queens on its right (penalty_diag_top/bot)
+        # the sum for the whole diagonal is (m-1)*m*(m+1)/6
+        return (((top_counts-1) * top_counts * (top_counts+1)) // 6).sum(axis=1) + (((bot_counts-1) * bot_counts * (bot_counts+1)) // 6).sum(axis=1)
+
+    def swap_deltas(self, permutations, top_counts, bot_counts, position):
+
+        # delta of the energy exchanging the queens of the columns position and position+1 of each board
+        # only the two diagonals left by each queen and the two diagonals where they arrive are modified
+        permutations = np.asarray(permutations, dtype=np.int64)
+        boards = np.arange(len(permutations))
+        queen = permutations[:, position]
+        next_queen = permutations[:, position+1]
+
+        top_delta = self.diagonals_delta(top_counts, boards, [queen + position, next_queen + position+1], [queen + position+1, next_queen + position])
+
+        bottom = self.number_queens-1
+        bot_delta = self.diagonals_delta(bot_counts, boards, [queen - position + bottom, next_queen - position-1 + bottom], [queen - position-1 + bottom, next_queen - position + bottom])
+
+        return top_delta + bot_delta
+
+    def diagonals_delta(self, counts, boards, removed_diagonals, added_diagonals):
+
+        # removing a queen from a diagonal with m queens changes its value by -(m-1)*m/2 and adding a queen by m*(m+1)/2
+        # the updates are applied in order because the two queens can leave (or arrive to) the same diagonal
+        delta = np.zeros(len(boards), dtype=np.int64)
+        updated_diagonals = []
+
+        for diagonal, sign in [(diagonal, -1) for diagonal in removed_diagonals] + [(diagonal, 1) for diagonal in added_diagonals]:
+
+            queens = counts[boards, diagonal].astype(np.int64)
+            for previous_diagonal, previous_sign in updated_diagonals:
+                queens += previous_sign * (previous_diagonal == diagonal)
+
+            if sign == -1: delta -= (queens-1) * queens // 2
+            else: delta += queens * (queens+1) // 2
+
+            updated_diagonals.append((diagonal, sign))
+
+        return delta
@@ -0,0 +1,66 @@
+import numpy as np
+from collections import Counter
+
+from vectorizedMetropolis import VectorizedMetropolis
+from annealing_schedule import acceptance_probabilities
+
+class LazyMetropolis(VectorizedMetropolis):
+
+    def load_tables(self, deltas_tables):
+
+        # the tables are not precalculated, they are rows of the landscape cache (there is no row for each state)
+        self.landscape = deltas_tables['landscape']
+        self.deltas = self.landscape.deltas_slots
+        self.successors = self.landscape.successors_slots
+        self.number_states = self.landscape.permutation_space.size
+
+    def calculate_valid_states(self, deltas_tables):
+
+        # the random states are always valid (see generate_random_states)
+        pass
+
+    def prepare_acceptance_table(self):
+
+        # the deltas are not known before the execution, the acceptance is calculated for each proposal
+        pass
+
+    def get_acceptance(self, i, rows, moves):
+
+        return acceptance_probabilities(self.calculate_beta_value(i), self.deltas[rows, moves])
+
+    def get_shared_table_names(self):
+
+        # the slots of the landscape cache are filled by each worker, they are not shared
+        return []
+
+    def execute_metropolis(self):
+
+        counts_dict = super().execute_metropolis()
+
+        cache_statistics = self.landscape.get_cache_statistics()
+        for name in ['hits', 'misses', 'evictions']:
+            self.tools.metrics.count('landscape_cache_' + name, cache_statistics[name])
+
+        print("<i> Lazy Metropolis => Landscape cache", cache_statistics)
+
+        return counts_dict
+
+    def get_rows(self, states):
+
+        return self.landscape.get_slots(states)
+
+    def generate_random_states(self, n_chains):
+
+        # the states are generated directly with the fixed queen in its position (there is no table of valid states)
+        return self.landscape.permutation_space.random_ranks(n_chains, self.tools.fixed_position_queen[0], self.tools.fixed_position_queen[1])
+
+    # the number of states is too big to have an array of counts, only the produced states are counted
+    def empty_counts(self):
+
+        return Counter()
+
+    def count_states(self, states):
+
+        unique_states, counts = np.unique(states, return_counts=True)
+
+        return Counter(dict(zip(unique_states.tolist(), counts.tolist())))
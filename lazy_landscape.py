@@ -0,0 +1,99 @@
+import numpy as np
+from collections import OrderedDict
+
+from permutation_space import PermutationSpace
+from incremental_delta import IncrementalDeltaEvaluator
+from n_queen_solutions_generator import n_queen_solution_ranks
+
+class LazyLandscape:
+
+    def __init__(self, number_queens, tools):
+
+        self.number_queens = number_queens
+        self.tools = tools
+
+        self.permutation_space = PermutationSpace(number_queens)
+        self.delta_evaluator = IncrementalDeltaEvaluator(number_queens)
+        self.barrier_energy_value = self.tools.config_variables['barrier_energy_value']
+
+        # the deltas and successors of the visited states are saved in slots of fixed size arrays
+        # cache_slots is ordered from the least to the most recently used state (LRU)
+        self.cache_size = self.tools.config_variables['lazy_cache_size']
+        self.deltas_slots = np.empty((self.cache_size, 2*number_queens), dtype=np.int32)
+        self.successors_slots = np.empty((self.cache_size, 2*number_queens), dtype=np.int64)
+        self.cache_slots = OrderedDict()
+
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_evictions = 0
+
+    def get_indexes_min_energy(self):
+
+        # the boards without collisions have energy 0, they are the solutions of the n-queen problem
+        return [int(rank) for rank in n_queen_solution_ranks(self.number_queens, number_workers=self.tools.config_variables['number_workers'])]
+
+    def get_slots(self, states):
+
+        unique_states, inverse = np.unique(states, return_inverse=True)
+
+        if len(unique_states) > self.cache_size:
+            raise ValueError('<*> ERROR: The lazy cache size', self.cache_size, 'is lower than the number of different states', len(unique_states), 'of the chains. Increase lazy_cache_size or reduce metropolis_batch_size')
+
+        slots = np.empty(len(unique_states), dtype=np.int64)
+        missing = []
+
+        for index, state in enumerate(unique_states.tolist()):
+
+            slot = self.cache_slots.get(state)
+            if slot == None:
+                missing.append(index)
+            else:
+                self.cache_slots.move_to_end(state)
+                slots[index] = slot
+
+        self.cache_hits += len(unique_states) - len(missing)
+        self.cache_misses += len(missing)
+
+        if len(missing) > 0:
+
+            # free slots are used first, then the least recently used states are evicted
+            # the states of this call were moved to the end, so they are never evicted here
+            for index in missing:
+
+                if len(self.cache_slots) < self.cache_size:
+                    slot = len(self.cache_slots)
+                else:
+                    slot = self.cache_slots.popitem(last=False)[1]
+                    self.cache_evictions += 1
+
+                self.cache_slots[int(unique_states[index])] = slot
+                slots[index] = slot
+
+            self.calculate_rows(unique_states[missing], slots[missing])
+
+        return slots[inverse]
+
+    def calculate_rows(self, states, slots):
+
+        permutations = self.permutation_space.unrank_array(states)
+        codes = self.permutation_space.lehmer_codes(permutations)
+
+        # the deltas of the swaps are calculated from the number of queens of each diagonal (there is no evaluation of the new boards)
+        top_counts, bot_counts = self.delta_evaluator.diagonal_counts(permutations)
+
+        # the moves out of the range (first group -1 and last group +1) have the barrier energy and they keep the same state
+        self.deltas_slots[slots] = self.barrier_energy_value
+        self.successors_slots[slots] = states[:, None]
+
+        for position in range(self.number_queens-1):
+
+            new_ranks = self.permutation_space.adjacent_swap_ranks(states, codes, permutations, position)
+            delta = self.delta_evaluator.swap_deltas(permutations, top_counts, bot_counts, position)
+
+            for move in [2*position, 2*(position+1)+1]:
+                self.successors_slots[slots, move] = new_ranks
+                self.deltas_slots[slots, move] = delta
+
+    def get_cache_statistics(self):
+
+        return {'size': len(self.cache_slots), 'capacity': self.cache_size, 'hits': self.cache_hits, 'misses': self.cache_misses, 'evictions': self.cache_evictions}
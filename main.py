@@ -1,68 +1,113 @@
 import utils
 import problem_generator
+import lazy_landscape
 import qms
 from matplotlib import pyplot
+import os
+import numpy as np
 import time
 import datetime
 from collections import OrderedDict
 
-from n_queen_solutions_generator import n_queen_solution_by_n
+from n_queen_solutions_generator import first_n_queen_solution
 import sys
 
 
-print('\n###################################################################')
-print('##                    QMS Open Source Software                   ##')
-print('##                                                               ##')
-print('##           Open version to solve any n-queen problem           ##')
-print('###################################################################\n')
+def write_metrics(tools, metrics_path):
 
-time_start = time.time()
+    # the metrics of the classical and the quantum metropolis are saved together (the file is rewritten after each phase)
+    if metrics_path != None:
+        tools.metrics.write(metrics_path)
+        print('<i> Metrics saved in', metrics_path)
 
-#Read config file with the QFold configuration variables
-config_path = './config/config.json'
-tools = utils.Utils(config_path)
+def main():
 
-args = tools.parse_arguments()
+    print('\n###################################################################')
+    print('##                    QMS Open Source Software                   ##')
+    print('##                                                               ##')
+    print('##           Open version to solve any n-queen problem           ##')
+    print('###################################################################\n')
 
-# if one queen has a fixed position, it saves as (column, row)
-if (args.queen!=None and args.value!=None) and (args.queen >= args.number_queens or args.value >= args.number_queens):
-    print('<*> ERROR: The column or the row (', args.queen, ',', args.value, ') can not be grether than the number of queens', args.number_queens)
-    sys.exit(0)
+    time_start = time.time()
 
-n_queen_solutions = n_queen_solution_by_n(args.number_queens)
-if len(n_queen_solutions) < 1:
-    print("<*> ERROR There are no solutions for the problem of", args.number_queens, "queens")
-    sys.exit(0)
+    #Read config file with the QFold configuration variables
+    config_path = './config/config.json'
+    tools = utils.Utils(config_path)
 
-# generate a problem description of the input file that is valid for qms
-progen = problem_generator.Problem_generator(number_queens=args.number_queens)
-input_n_queen = progen.generate_input()
+    args = tools.parse_arguments()
 
-print('N-Queen board generated!!')
+    # the seed is only fixed if it is given (it is saved with the results)
+    if args.seed != None:
+        np.random.seed(args.seed)
 
-solver = qms.QMS(input_n_queen, False, tools)
+    # if one queen has a fixed position, it saves as (column, row)
+    if (args.queen!=None and args.value!=None) and (args.queen >= args.number_queens or args.value >= args.number_queens):
+        print('<*> ERROR: The column or the row (', args.queen, ',', args.value, ') can not be grether than the number of queens', args.number_queens)
+        sys.exit(0)
 
+    # the search stops in the first solution (it is not necessary to enumerate all of them)
+    if first_n_queen_solution(args.number_queens) == None:
+        print("<*> ERROR There are no solutions for the problem of", args.number_queens, "queens")
+        sys.exit(0)
 
-classic_tts = solver.execute_classical_metropolis(mode='TTS')
-step_minimum_c = min(classic_tts, key=classic_tts.get)
-minimum_classic = classic_tts[step_minimum_c]
-print('Minimum tts:', minimum_classic, 'at step:', step_minimum_c)
+    # generate a problem description of the input file that is valid for qms
+    # in lazy mode the energies are only calculated for the visited states (it is necessary for big boards)
+    # else the generator is given to qms, the energies are calculated in blocks while the deltas tables are filled
+    with tools.metrics.phase('generate_problem'):
+        if tools.config_variables['lazy_landscape']:
+            input_n_queen = lazy_landscape.LazyLandscape(args.number_queens, tools)
+        else:
+            input_n_queen = problem_generator.Problem_generator(number_queens=args.number_queens)
 
-if tools.config_variables['output_plot']: 
-    pyplot.plot(classic_tts.keys(), classic_tts.values())
-    pyplot.savefig('classical_tts_'+str(args.number_queens)+'.png')
+    print('N-Queen board generated!!')
 
+    solver = qms.QMS(input_n_queen, False, tools)
 
-quantum_tts = solver.execute_quantum_metropolis(mode='TTS')
-step_minimum_q = min(quantum_tts, key=quantum_tts.get)
-minimum_quantum = quantum_tts[step_minimum_q]
-print('Minimum tts:', minimum_quantum, 'at step:', step_minimum_q)
 
-quantum_tts = OrderedDict(sorted(quantum_tts.items()))
+    # the profile only includes this process (not the worker processes)
+    if args.profile:
+        with tools.metrics.profile_block(os.path.splitext(args.metrics if args.metrics != None else 'metrics.json')[0] + '.prof'):
+            classic_tts = solver.execute_classical_metropolis(mode='TTS', number_workers=args.workers)
+    else:
+        classic_tts = solver.execute_classical_metropolis(mode='TTS', number_workers=args.workers)
 
-if tools.config_variables['output_plot']: 
-    pyplot.plot(quantum_tts.keys(), quantum_tts.values())
-    pyplot.savefig('quantum_tts_'+str(args.number_queens)+'.png')
+    step_minimum_c = min(classic_tts, key=classic_tts.get)
+    minimum_classic = classic_tts[step_minimum_c]
+    print('Minimum tts:', minimum_classic, 'at step:', step_minimum_c)
 
+    if tools.config_variables['output_plot']: 
+        pyplot.plot(classic_tts.keys(), classic_tts.values())
+        pyplot.savefig('classical_tts_'+str(args.number_queens)+'.png')
 
-print("<i> N-Queen => Size", args.number_queens, "calculated in", str(datetime.timedelta(seconds=time.time() - time_start)), "(hh:mm:ss)")
\ No newline at end of file
+
+    # the classical results and metrics are saved before the quantum metropolis (they are not lost if it fails)
+    run_id = tools.save_results('main', args.number_queens, {'classical': classic_tts}, seed=args.seed)
+    write_metrics(tools, args.metrics)
+
+    # the quantum walk needs the tables of all states, the lazy landscape only has the visited states
+    if tools.config_variables['quantum_engine'] == 'walk' and 'permutation_space' not in solver.deltas:
+        print('<i> Quantum Walk Metropolis => It is skipped, it needs the tables of all states (lazy_landscape is enabled)')
+
+    else:
+
+        quantum_tts = solver.execute_quantum_metropolis(mode='TTS')
+        step_minimum_q = min(quantum_tts, key=quantum_tts.get)
+        minimum_quantum = quantum_tts[step_minimum_q]
+        print('Minimum tts:', minimum_quantum, 'at step:', step_minimum_q)
+
+        quantum_tts = OrderedDict(sorted(quantum_tts.items()))
+
+        if tools.config_variables['output_plot']: 
+            pyplot.plot(quantum_tts.keys(), quantum_tts.values())
+            pyplot.savefig('quantum_tts_'+str(args.number_queens)+'.png')
+
+        # the quantum tts are added to the same run than the classical tts (the plots compare the results of each run)
+        tools.save_results('main', args.number_queens, {'quantum': quantum_tts}, seed=args.seed, run_id=run_id)
+        write_metrics(tools, args.metrics)
+
+
+    print("<i> N-Queen => Size", args.number_queens, "calculated in", str(datetime.timedelta(seconds=time.time() - time_start)), "(hh:mm:ss)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+import io
+import json
+import time
+import pstats
+import cProfile
+import resource
+from collections import Counter
+from contextlib import contextmanager
+
+class Metrics:
+
+    # phases: wall time, cpu time and peak memory of each phase of the execution (generate the problem, calculate the deltas...)
+    # steps: time and counters (proposals, acceptances...) of each step of each metropolis engine
+    # counters: global counters (cache hits and misses)
+    def __init__(self):
+
+        self.phases = {}
+        self.steps = {}
+        self.counters = Counter()
+        self.profile = None
+
+    def get_peak_rss(self):
+
+        # maximum resident memory (bytes) of this process and of the finished worker processes (ru_maxrss is in KB in linux)
+        return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * 1024
+
+    @contextmanager
+    def phase(self, name):
+
+        time_start = time.time()
+        cpu_start = time.process_time()
+
+        try:
+            yield
+        finally:
+            # a phase executed more than once accumulates its times
+            phase = self.phases.setdefault(name, {'wall_time': 0, 'cpu_time': 0, 'calls': 0})
+            phase['wall_time'] += time.time() - time_start
+            phase['cpu_time'] += time.process_time() - cpu_start
+            phase['calls'] += 1
+            phase['peak_rss'] = self.get_peak_rss()
+
+    def add_step(self, engine, step, values):
+
+        step_values = self.steps.setdefault(engine, {}).setdefault(step, Counter())
+        step_values.update(values)
+        step_values['peak_rss'] = self.get_peak_rss()
+
+    def count(self, name, value=1):
+
+        self.counters[name] += value
+
+    @contextmanager
+    def profile_block(self, path, number_functions=30):
+
+        # the block is executed with cProfile, the statistics are saved in path (pstats format) and the slowest functions in the metrics
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(path)
+
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(number_functions)
+            self.profile = {'path': path, 'cumulative': stream.getvalue().splitlines()}
+
+    def to_dict(self):
+
+        metrics = {}
+        metrics['phases'] = self.phases
+        metrics['steps'] = {engine: {str(step): dict(values) for step, values in steps.items()} for engine, steps in self.steps.items()}
+        metrics['counters'] = dict(self.counters)
+        metrics['peak_rss'] = self.get_peak_rss()
+        if self.profile != None: metrics['profile'] = self.profile
+
+        return metrics
+
+    def write(self, path):
+
+        with open(path, 'w') as outfile:
+            json.dump(self.to_dict(), outfile, indent=4)
@@ -1,107 +1,136 @@
-# This code is contributed by Nikhil Vinay
-# This code was extracted from https://www.geeksforgeeks.org/printing-solutions-n-queen-problem/
-
-# Python program for above approach
-import math
-
-result = []
-
-# Program to solve N-Queens Problem
-def solveBoard(board, row, rowmask, ldmask, rdmask):
-
-    n = len(board)
-
-    # All_rows_filled is a bit mask
-    # having all N bits set
-    all_rows_filled = (1 << n) - 1
-
-    # If rowmask will have all bits set, means
-    # queen has been placed successfully
-    # in all rows and board is displayed
-    if (rowmask == all_rows_filled):
-        v = []
-        for i in board:
-            for j in range(len(i)):
-                if i[j] == 'Q':
-                    v.append(j+1)
-        result.append(v)
-
-    # We extract a bit mask(safe) by rowmask,
-    # ldmask and rdmask. all set bits of 'safe'
-    # indicates the safe column index for queen
-    # placement of this iteration for row index(row).
-    safe = all_rows_filled & (~(rowmask | ldmask | rdmask))
-
-    while (safe > 0):
-
-        # Extracts the right-most set bit
-        # (safe column index) where queen
-        # can be placed for this row
-        p = safe & (-safe)
-        col = (int)(math.log(p)/math.log(2))
-        board[row][col] = 'Q'
-
-        # This is very important:
-        # we need to update rowmask, ldmask and rdmask
-        # for next row as safe index for queen placement
-        # will be decided by these three bit masks.
-
-        # We have all three rowmask, ldmask and
-        # rdmask as 0 in beginning. Suppose, we are placing
-        # queen at 1st column index at 0th row. rowmask, ldmask
-        # and rdmask will change for next row as below:
-
-        # rowmask's 1st bit will be set by OR operation
-        # rowmask = 00000000000000000000000000000010
-
-        # ldmask will change by setting 1st
-        # bit by OR operation  and left shifting
-        # by 1 as it has to block the next column
-        # of next row because that will fall on left diagonal.
-        # ldmask = 00000000000000000000000000000100
-
-        # rdmask will change by setting 1st bit
-        # by OR operation and right shifting by 1
-        # as it has to block the previous column
-        # of next row because that will fall on right diagonal.
-        # rdmask = 00000000000000000000000000000001
-
-        # these bit masks will keep updated in each
-        # iteration for next row
-        solveBoard(board, row+1, rowmask | p, (ldmask | p) << 1, (rdmask | p) >> 1)
-
-        # Reset right-most set bit to 0 so, next
-        # iteration will continue by placing the queen
-        # at another safe column index of this row
-        safe = safe & (safe-1)
-
-        # Backtracking, replace 'Q' by ' '
-        board[row][col] = ' '
-
-# Program to print board
-def printBoard(board):
-    for row in board:
-        print("|" + "|".join(row) + "|")
-
-# Driver Code
-def n_queen_solution_by_n(n):
-
-    board = []
-
-    for _ in range(n):
-        row = []
-        for _ in range(n):
-            row.append(' ')
-        board.append(row)
-
-    rowmask = 0
-    ldmask = 0
-    rdmask = 0
-    row = 0
-
-    # Function Call
-    result.clear()
-    solveBoard(board, row, rowmask, ldmask, rdmask)
-    result.sort()
-
-    return result
\ No newline at end of file
+# The bitmask approach (one mask for the columns and one for each direction of the diagonals) was taken from
+# https://www.geeksforgeeks.org/printing-solutions-n-queen-problem/ (contributed by Nikhil Vinay)
+# The recursion with a global list of results was replaced by an iterative search without global state
+
+import multiprocessing
+import numpy as np
+
+from permutation_space import PermutationSpace
+
+# count: only the number of solutions, first: stop in the first solution, all: all the solutions
+ENUMERATION_MODES = ['count', 'first', 'all']
+
+def enumerate_branch(number_queens, first_column, mode):
+
+    # solutions with the queen of the first row in first_column (the branches of the first row are independent)
+    # the solutions are given as the 1-indexed column of the queen in each row
+    all_columns = (1 << number_queens) - 1
+
+    # bit of the queen of each row, safe columns of each row that are not explored yet and the attacked columns of each row
+    placed = [0] * number_queens
+    available = [0] * number_queens
+    columns_mask = [0] * number_queens
+    left_mask = [0] * number_queens
+    right_mask = [0] * number_queens
+
+    placed[0] = 1 << first_column
+    if number_queens == 1:
+        return 1, [[1]] if mode != 'count' else []
+
+    columns_mask[1] = placed[0]
+    left_mask[1] = (placed[0] << 1) & all_columns
+    right_mask[1] = placed[0] >> 1
+    available[1] = all_columns & ~(columns_mask[1] | left_mask[1] | right_mask[1])
+
+    number_solutions = 0
+    solutions = []
+
+    row = 1
+    while row > 0:
+
+        # all the columns of this row are explored, back to the previous row
+        if available[row] == 0:
+            row -= 1
+            continue
+
+        # the lowest safe column is explored and removed from the available columns
+        bit = available[row] & -available[row]
+        available[row] ^= bit
+        placed[row] = bit
+
+        if row == number_queens-1:
+
+            number_solutions += 1
+            if mode != 'count':
+                solutions.append([queen.bit_length() for queen in placed])
+            if mode == 'first':
+                break
+
+            continue
+
+        # the diagonals move one column in each row
+        columns_mask[row+1] = columns_mask[row] | bit
+        left_mask[row+1] = ((left_mask[row] | bit) << 1) & all_columns
+        right_mask[row+1] = (right_mask[row] | bit) >> 1
+        available[row+1] = all_columns & ~(columns_mask[row+1] | left_mask[row+1] | right_mask[row+1])
+        row += 1
+
+    return number_solutions, solutions
+
+def execute_branch(arguments):
+
+    return enumerate_branch(*arguments)
+
+def enumerate_solutions(number_queens, mode='all', number_workers=1):
+
+    if mode not in ENUMERATION_MODES:
+        raise ValueError('<*> ERROR: The enumeration mode', mode, 'is not valid. The valid modes are', ENUMERATION_MODES)
+
+    # the first solution is searched branch by branch (the search stops when it is found)
+    if mode == 'first':
+        for first_column in range(number_queens):
+            number_solutions, solutions = enumerate_branch(number_queens, first_column, mode)
+            if number_solutions > 0:
+                return 1, solutions
+
+        return 0, []
+
+    # the mirror of a solution (column c -> n-1-c) is also a solution, so only the first half of the columns of the first row are explored
+    # with an odd number of queens, the middle column is its own mirror and it is explored completely
+    half_columns = list(range(number_queens // 2))
+    branches = half_columns + ([number_queens // 2] if number_queens % 2 == 1 else [])
+
+    if number_workers > 1 and len(branches) > 1:
+        with multiprocessing.Pool(min(number_workers, len(branches))) as pool:
+            results = pool.map(execute_branch, [(number_queens, first_column, mode) for first_column in branches])
+    else:
+        results = [enumerate_branch(number_queens, first_column, mode) for first_column in branches]
+
+    number_solutions = 0
+    solutions = []
+    for first_column, (branch_number_solutions, branch_solutions) in zip(branches, results):
+
+        is_mirrored = first_column in half_columns
+        number_solutions += 2*branch_number_solutions if is_mirrored else branch_number_solutions
+
+        solutions += branch_solutions
+        if is_mirrored:
+            solutions += [[number_queens+1-column for column in solution] for solution in branch_solutions]
+
+    return number_solutions, solutions
+
+def count_n_queen_solutions(n, number_workers=1):
+
+    return enumerate_solutions(n, 'count', number_workers)[0]
+
+def first_n_queen_solution(n):
+
+    # None if the problem has no solution
+    solutions = enumerate_solutions(n, 'first')[1]
+    return solutions[0] if len(solutions) > 0 else None
+
+def n_queen_solution_by_n(n, number_workers=1):
+
+    return sorted(enumerate_solutions(n, 'all', number_workers)[1])
+
+def n_queen_solution_ranks(n, fixed_position_queen=[-1, -1], number_workers=1):
+
+    # Lehmer ranks of the solutions (the states of the tables of the solver, see PermutationSpace)
+    # the solution of the rows is also the solution of the columns (the transposed board), so the 1-indexed columns are the permutation
+    solutions = np.array(n_queen_solution_by_n(n, number_workers), dtype=np.int64).reshape(-1, n) - 1
+
+    # with a fixed queen only the solutions with the queen in its position
+    if fixed_position_queen[0] != -1:
+        solutions = solutions[solutions[:, fixed_position_queen[0]] == fixed_position_queen[1]]
+
+    return np.sort(PermutationSpace(n).rank_array(solutions))
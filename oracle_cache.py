@@ -0,0 +1,88 @@
+import os
+import json
+import hashlib
+from collections import OrderedDict
+from qiskit import qpy
+
+class OracleCache:
+
+    # the oracles are identified by the hash of the quantized coords and of the parameters of the circuit
+    # (different betas usually have the same coords when they are quantized with out_bits)
+    # the last used circuits are kept in memory (LRU) and all circuits are saved in disk (qpy format)
+    def __init__(self, cache_path, cache_size, metrics=None):
+
+        self.cache_path = cache_path
+        self.cache_size = cache_size
+        self.metrics = metrics
+
+        self.circuits = OrderedDict()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get_digest(self, coords, parameters):
+
+        description = {'coords': sorted(coords.items()), 'parameters': parameters}
+
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()[:16]
+
+    def get_path(self, digest):
+
+        return os.path.join(self.cache_path, 'oracle_' + digest + '.qpy')
+
+    def load(self, coords, parameters):
+
+        digest = self.get_digest(coords, parameters)
+
+        if digest in self.circuits:
+            self.circuits.move_to_end(digest)
+            self.count('memory_hits')
+            return self.circuits[digest]
+
+        if os.path.isfile(self.get_path(digest)):
+            with open(self.get_path(digest), 'rb') as circuit_file:
+                circuit = qpy.load(circuit_file)[0]
+
+            self.count('disk_hits')
+            self.add_to_memory(digest, circuit)
+            return circuit
+
+        self.count('misses')
+        return None
+
+    def save(self, coords, parameters, circuit):
+
+        digest = self.get_digest(coords, parameters)
+        self.add_to_memory(digest, circuit)
+
+        # the file is written with other name and renamed at once (other process could be reading the same oracle)
+        os.makedirs(self.cache_path, exist_ok=True)
+        temp_path = self.get_path(digest) + '.tmp' + str(os.getpid())
+        with open(temp_path, 'wb') as circuit_file:
+            qpy.dump(circuit, circuit_file)
+
+        os.replace(temp_path, self.get_path(digest))
+
+    def add_to_memory(self, digest, circuit):
+
+        self.circuits[digest] = circuit
+        self.circuits.move_to_end(digest)
+
+        if len(self.circuits) > self.cache_size:
+            self.circuits.popitem(last=False)
+
+    def count(self, name):
+
+        setattr(self, name, getattr(self, name) + 1)
+        if self.metrics != None: self.metrics.count('oracle_cache_' + name)
+
+    def get_hit_rate(self):
+
+        requests = self.memory_hits + self.disk_hits + self.misses
+
+        return (self.memory_hits + self.disk_hits) / requests if requests > 0 else 0
+
+    def report(self):
+
+        print('<i> Oracle cache => memory hits:', self.memory_hits, 'disk hits:', self.disk_hits, 'misses:', self.misses, 'hit rate:', round(self.get_hit_rate(), 3))
@@ -0,0 +1,136 @@
+import os
+import json
+import time
+import hashlib
+import itertools
+import numpy as np
+
+import problem_generator
+import qms
+import worker_pool
+
+def execute_sweep_job(job):
+
+    time_start = time.time()
+
+    # the solver of the number of queens of the pool (the tables of the solver are in shared memory, see QMS.share_tables)
+    worker_solver = worker_pool.get_worker_object()
+
+    # the workers are forked with the same random state, each job is seeded with its own seed (the jobs do not repeat the same random numbers)
+    np.random.seed(job['seed'])
+
+    # each worker has its own copy of the tools, so the parameters of the job can be written in its config
+    worker_solver.tools.config_variables.update(job['config_variables'])
+
+    # the jobs are already distributed between the processes, each job is executed in one process
+    classic_tts = worker_solver.execute_classical_metropolis(mode='TTS', number_workers=1)
+    step_minimum = min(classic_tts, key=classic_tts.get)
+
+    record = {}
+    record['job_id'] = job['job_id']
+    record['parameters'] = job['parameters']
+    record['seed'] = job['seed']
+    record['tts'] = {str(step): value for step, value in classic_tts.items()}
+    record['minimum_tts'] = classic_tts[step_minimum]
+    record['minimum_step'] = step_minimum
+    record['time'] = time.time() - time_start
+
+    return record
+
+class ParameterSweep:
+
+    def __init__(self, tools, grid, results_path, number_workers=None, seed=None):
+
+        self.tools = tools
+        self.grid = grid
+        self.results_path = results_path
+        self.number_workers = number_workers if number_workers != None else self.tools.config_variables['number_workers']
+
+        # without a seed the sweep uses a random one (it is printed, so the sweep can be repeated)
+        self.seed = seed if seed != None else int(np.random.SeedSequence().generate_state(1)[0])
+
+        if 'number_queens' not in self.grid:
+            raise ValueError('<*> ERROR: The parameter grid should contain the list of number_queens')
+
+        for parameter in self.grid.keys():
+            if parameter != 'number_queens' and parameter not in self.tools.config_variables:
+                raise ValueError('<*> ERROR: The parameter', parameter, 'of the grid is not a config variable')
+
+    def generate_jobs(self):
+
+        # one job for each combination of the values of the grid (in the order of the grid file)
+        parameters_names = list(self.grid.keys())
+        jobs = []
+
+        for values in itertools.product(*[self.grid[name] for name in parameters_names]):
+
+            parameters = dict(zip(parameters_names, values))
+
+            job = {}
+            job['job_id'] = '|'.join(name + '=' + str(parameters[name]) for name in parameters_names)
+            job['parameters'] = parameters
+            job['config_variables'] = {name: value for name, value in parameters.items() if name != 'number_queens'}
+            job['seed'] = self.get_job_seed(job['job_id'])
+            jobs.append(job)
+
+        return jobs
+
+    def get_job_seed(self, job_id):
+
+        # the seed of a job only depends on the seed of the sweep and on its id (a resumed sweep uses the same seeds)
+        job_key = int(hashlib.sha256(job_id.encode()).hexdigest()[:16], 16)
+
+        return int(np.random.SeedSequence([self.seed, job_key]).generate_state(1)[0])
+
+    def read_completed_jobs(self):
+
+        # each line of the results file is the record of a completed job
+        completed_jobs = set()
+        if os.path.isfile(self.results_path):
+            with open(self.results_path) as results_file:
+                for line in results_file:
+                    if line.strip() != '':
+                        completed_jobs.add(json.loads(line)['job_id'])
+
+        return completed_jobs
+
+    def execute_sweep(self):
+
+        completed_jobs = self.read_completed_jobs()
+        pending_jobs = [job for job in self.generate_jobs() if job['job_id'] not in completed_jobs]
+
+        print('<i> Parameter sweep =>', len(completed_jobs), 'jobs already completed,', len(pending_jobs), 'jobs pending (seed', str(self.seed) + ')')
+
+        if os.path.dirname(self.results_path) != '':
+            os.makedirs(os.path.dirname(self.results_path), exist_ok=True)
+
+        for number_queens in list(dict.fromkeys(job['parameters']['number_queens'] for job in pending_jobs)):
+
+            jobs_n = [job for job in pending_jobs if job['parameters']['number_queens'] == number_queens]
+
+            # the energies and deltas tables are calculated once for all jobs with the same number of queens
+            print('    ⬤ Generating tables for', number_queens, 'queens (', len(jobs_n), 'jobs )')
+            progen = problem_generator.Problem_generator(number_queens=number_queens)
+            solver = qms.QMS(progen, False, self.tools)
+
+            # the tables are published once in shared memory, the workers attach them instead of receiving a copy
+            solver.share_tables()
+            try:
+                with worker_pool.create_pool(min(self.number_workers, len(jobs_n)), solver) as pool:
+
+                    # each record is written when the job finishes, so an interrupted sweep can be resumed
+                    for record in pool.imap_unordered(execute_sweep_job, jobs_n):
+                        self.write_record(record)
+                        self.tools.save_results('sweep', number_queens, {'classical': record['tts']}, dict(self.tools.config_variables, **self.get_job(jobs_n, record['job_id'])['config_variables']), record['seed'])
+                        print('    ⬤ Job', record['job_id'], '=> minimum tts:', record['minimum_tts'], 'at step:', record['minimum_step'])
+            finally:
+                solver.release_tables()
+
+    def get_job(self, jobs, job_id):
+
+        return next(job for job in jobs if job['job_id'] == job_id)
+
+    def write_record(self, record):
+
+        with open(self.results_path, 'a') as results_file:
+            results_file.write(json.dumps(record) + '\n')
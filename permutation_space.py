@@ -0,0 +1,156 @@
+import math
+import itertools
+import numpy as np
+
+class PermutationSpace:
+
+    def __init__(self, number_elements):
+
+        self.number_elements = number_elements
+        self.size = math.factorial(number_elements)
+
+        # weight of each digit of the Lehmer code: (n-1)!, (n-2)!, ..., 0!
+        self.digit_weights = np.array([math.factorial(number_elements-1-index) for index in range(number_elements)], dtype=np.int64)
+
+        # the ranks fit in int32 until 12 elements, bigger spaces use int64
+        self.rank_dtype = np.int32 if self.size <= np.iinfo(np.int32).max else np.int64
+
+    def lehmer_codes(self, permutations):
+
+        # the digit i of the Lehmer code is the number of elements on the right of position i that are lower than the element in i
+        permutations = np.atleast_2d(permutations)
+        codes = np.zeros(permutations.shape, dtype=np.int64)
+        for index in range(self.number_elements-1):
+            codes[:, index] = np.sum(permutations[:, index+1:] < permutations[:, index:index+1], axis=1)
+
+        return codes
+
+    def rank_array(self, permutations):
+
+        return (self.lehmer_codes(permutations) @ self.digit_weights).astype(self.rank_dtype)
+
+    def unrank_array(self, ranks):
+
+        ranks = np.atleast_1d(np.asarray(ranks, dtype=np.int64))
+        permutations = np.empty((len(ranks), self.number_elements), dtype=np.int8)
+
+        # the digit i of the Lehmer code selects the d-th lowest element that is not used yet
+        used = np.zeros((len(ranks), self.number_elements), dtype=bool)
+        for index in range(self.number_elements):
+            digits = (ranks // self.digit_weights[index]) % (self.number_elements - index)
+            elements = np.argmax(np.cumsum(~used, axis=1) == (digits+1)[:, None], axis=1)
+            permutations[:, index] = elements
+            used[np.arange(len(ranks)), elements] = True
+
+        return permutations
+
+    def rank(self, permutation):
+
+        return int(self.rank_array(np.array(permutation))[0])
+
+    def unrank(self, rank):
+
+        return self.unrank_array([rank])[0].tolist()
+
+    def all_permutations(self):
+
+        # ranks follow the lexicographic order, the same order than itertools.permutations
+        return self.unrank_array(np.arange(self.size))
+
+    def permutation_blocks(self, block_size, partition=None):
+
+        # the permutations with the same prefix of length depth have consecutive ranks: the prefix followed by the permutations of the remaining elements
+        # the depth is the minimum to have blocks of (n-depth)! <= block_size permutations
+        depth = 0
+        while depth < self.number_elements and math.factorial(self.number_elements - depth) > block_size: depth += 1
+
+        # a partition is the permutations with the same first element (ranks from partition*(n-1)! to (partition+1)*(n-1)!-1)
+        if partition != None:
+            depth = max(depth, 1)
+            prefixes = ((partition,) + prefix for prefix in itertools.permutations([element for element in range(self.number_elements) if element != partition], depth-1))
+            first_rank = partition * math.factorial(self.number_elements-1)
+        else:
+            prefixes = itertools.permutations(range(self.number_elements), depth)
+            first_rank = 0
+
+        suffixes = PermutationSpace(self.number_elements - depth).all_permutations()
+
+        # the same block array is filled for each prefix (it is overwritten in the next iteration)
+        block = np.empty((len(suffixes), self.number_elements), dtype=np.int8)
+
+        for prefix in prefixes:
+
+            remaining_elements = np.array([element for element in range(self.number_elements) if element not in prefix], dtype=np.int8)
+
+            block[:, :depth] = prefix
+            block[:, depth:] = remaining_elements[suffixes]
+
+            yield first_rank, block
+            first_rank += len(block)
+
+    def number_partitions(self):
+
+        return self.number_elements
+
+    def random_permutations(self, number_permutations, fixed_position=-1, fixed_element=-1):
+
+        # uniform random permutations. If there is a fixed element, only the other elements are permuted (there is no rejection)
+        elements = np.array([element for element in range(self.number_elements) if element != fixed_element], dtype=np.int8)
+        permutations = elements[np.argsort(np.random.random_sample((number_permutations, len(elements))), axis=1)]
+
+        if fixed_position != -1:
+            permutations = np.insert(permutations, fixed_position, fixed_element, axis=1)
+
+        return permutations
+
+    def random_ranks(self, number_ranks, fixed_position=-1, fixed_element=-1):
+
+        return self.rank_array(self.random_permutations(number_ranks, fixed_position, fixed_element))
+
+    def swap_positions(self):
+
+        # position p is the exchange of the elements in p and p+1
+        return list(range(self.number_elements-1))
+
+    def calculate_move_probabilities(self, fixed_position=-1):
+
+        # probability of proposing each move 2*coord + plusminus: a coord is chosen with probability 1/n and plus/minus with probability 1/2
+        # the first coord always moves +1 and the last coord always moves -1 (the direction is inverted if it is out of the range)
+        move_probabilities = np.full(2*self.number_elements, 1 / (2*self.number_elements))
+        move_probabilities[0] = 1 / self.number_elements
+        move_probabilities[1] = 0
+        move_probabilities[-2] = 0
+        move_probabilities[-1] = 1 / self.number_elements
+
+        # the moves that exchange the fixed position are never proposed, their probability is divided between the other moves
+        if fixed_position != -1:
+            for coord in range(self.number_elements):
+                for plusminus in [0,1]:
+                    if fixed_position in [coord, coord - 2*plusminus + 1]:
+                        move_probabilities[2*coord + plusminus] = 0
+
+            move_probabilities /= move_probabilities.sum()
+
+        return move_probabilities
+
+    def adjacent_swap_ranks(self, ranks, codes, permutations, position):
+
+        # exchanging the elements in position and position+1 only changes these two digits of the Lehmer code
+        # new digit in position: digit in position+1 (plus one if the element was lower than the next one)
+        # new digit in position+1: digit in position (minus one if the next element was lower than the element)
+        is_lower = (permutations[:, position] < permutations[:, position+1]).astype(np.int64)
+        new_digit = codes[:, position+1] + is_lower
+        new_next_digit = codes[:, position] - (1 - is_lower)
+
+        new_ranks = ranks + (new_digit - codes[:, position]) * self.digit_weights[position] + (new_next_digit - codes[:, position+1]) * self.digit_weights[position+1]
+
+        return new_ranks.astype(self.rank_dtype)
+
+    # string keys ('3-1-0-2') are only used to read/write the results (json, debug)
+    def key(self, rank):
+
+        return '-'.join(str(element) for element in self.unrank(rank))
+
+    def rank_of_key(self, key):
+
+        return self.rank(list(map(int, key.split('-'))))
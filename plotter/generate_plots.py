@@ -5,6 +5,7 @@ from os.path import isfile, join
 import utils
 import re
 
+from results_store import ResultsStore
 from plot_quantum_vs_classical import plot_q_vs_c_slope, plot_different_orders
 
 #Read config file with the QFold configuration variables
@@ -12,13 +13,27 @@ config_path = './config/config.json'
 
 tools = utils.Utils(config_path)
 
-# list elements to read
+results_store = ResultsStore(tools.get_config_variable('results_store_path'))
+
+# the old text files are imported once to the results store (the file name is the label of their runs)
+# the quantum engine of each file is the order of its name
 input_files = [f for f in listdir(tools.get_config_variable('path_tts_plot')) if isfile(join(tools.get_config_variable('path_tts_plot'), f))]
-results = {}
 for input_name in input_files:
+
     if re.match(r"[0-9]_queen.txt+", input_name):
-        results.update(tools.read_results_data(input_name))
+        engine = 'lemieux'
+    elif re.match(r"[0-9]_queen_qubitization.txt+", input_name):
+        engine = 'qubitization'
+    elif re.match(r"[0-9]_queen_sel_prepinv_r_prep.txt+", input_name):
+        engine = 'other'
+    else:
+        continue
+
+    if not results_store.has_label(input_name):
+        results_store.import_results_file(join(tools.get_config_variable('path_tts_plot'), input_name), int(input_name.split('_')[0]), engine, input_name)
+
+results = results_store.read_quantum_classical_data()
 
 #plot_q_vs_c_slope(results)
 
-plot_different_orders(input_files, tools)
\ No newline at end of file
+plot_different_orders(results_store)
@@ -1,8 +1,5 @@
-
-import re
 import numpy as np
 import matplotlib.pyplot as plt
-from collections import OrderedDict
 
 from bokeh.plotting import figure, show, output_file
 from bokeh.io import export_svgs
@@ -183,28 +180,20 @@ def get_plot_code_metric(order):
         if order=='lemieux': return "-bo"
         if order=='qubitization': return "--ys"
         if order=='other': return "-.g*"
+        if order=='walk': return ":rd"
+        return "-k^"
 
-def plot_different_orders(input_files, tools):
+def plot_different_orders(results_store, exclude_labels=['7_queen.txt']):
 
+    # minimum quantum tts of each run grouped by order (quantum engine) and number of queens
+    # the runs of 7_queen.txt are not included in the comparison of the orders
     results = {}
-    for input_name in input_files:
-        if re.match(r"[0-9]_queen.txt+", input_name):
-            key='lemieux'
-        elif re.match(r"[0-9]_queen_qubitization.txt+", input_name):
-            key='qubitization'
-        elif re.match(r"[0-9]_queen_sel_prepinv_r_prep.txt+", input_name):
-            key='other'
-        else:
-            key='skip'
-
-        if key != 'skip' and input_name != '7_queen.txt':
-            if key in results.keys(): results[key].update(tools.read_results_sorting_data(input_name, key))
-            else: results[key] = tools.read_results_sorting_data(input_name, key)
+    for _, number_queens, _, engine, minimum_tts in results_store.query_minimum_tts(exclude_labels=exclude_labels, metropolis='quantum'):
+        results.setdefault(engine, {}).setdefault(str(number_queens), []).append(minimum_tts)
 
+    # the rows are sorted by number of queens
     for order in results.keys():
 
-        results[order] = OrderedDict(sorted(results[order].items()))
-
         means = []
         stds = []
         for n in results[order].keys():
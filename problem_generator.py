@@ -1,10 +1,18 @@
 import itertools
+import numpy as np
+
+from permutation_space import PermutationSpace
+from incremental_delta import IncrementalDeltaEvaluator
+
+# it is necessary to change the version if the evaluation of the boards changes (the cached tables are not valid anymore)
+ENERGY_FUNCTION_VERSION = 1
 
 class Problem_generator:
 
     def __init__(self, number_queens):
 
         self.number_queens = number_queens
+        self.delta_evaluator = IncrementalDeltaEvaluator(number_queens)
 
     def generate_input(self):
 
@@ -23,14 +31,43 @@ class Problem_generator:
 
         return problem_desc
 
+    def generate_energies(self, block_size=100000):
+
+        # the energy of each permutation is stored in the position of its Lehmer rank
+        permutation_space = PermutationSpace(self.number_queens)
+        energies = np.empty(permutation_space.size, dtype=np.int32)
+
+        for first_rank, permutations, block_energies, _ in self.generate_blocks(permutation_space, block_size):
+            energies[first_rank:first_rank+len(permutations)] = block_energies
+
+        return energies
+
+    def generate_blocks(self, permutation_space, block_size=100000, partition=None):
+
+        # the permutations are generated in blocks of consecutive ranks and the energies of each block are calculated at once
+        # the diagonal counts of the block are also returned, they are used to calculate the deltas of the swaps (see calculate_swap_deltas)
+        # the permutations array of a block is overwritten by the next block
+        # with a partition, only the blocks of the partition (see permutation_blocks)
+        for first_rank, permutations in permutation_space.permutation_blocks(block_size, partition):
+
+            diagonal_counts = self.delta_evaluator.diagonal_counts(permutations)
+            yield first_rank, permutations, self.delta_evaluator.energies_from_counts(*diagonal_counts).astype(np.int32), diagonal_counts
+
+    def calculate_swap_deltas(self, permutations, diagonal_counts, position):
+
+        # delta of the energy exchanging the queens of the columns position and position+1 (without evaluating the new boards)
+        return self.delta_evaluator.swap_deltas(permutations, diagonal_counts[0], diagonal_counts[1], position)
+
     def calculate_eval_value(self, board):
 
+        # it contains an array of int of the position of each queen
+        return self.calculate_positions_value(list(map(int, board.split('-'))))
+
+    def calculate_positions_value(self, positions):
+
         # value is the final value of the board taking into account the collisions
         value = 0
 
-        # it contains an array of int of the position of each queen
-        positions = list(map(int, board.split('-')))
-
         # iterate over each queen to calculate its value except the last one that cannot be attacked by one other to its right
         for index_position in range(len(positions)-1):
 
@@ -63,4 +100,4 @@ class Problem_generator:
                     value += 1 + penalty_diag_bot
                     penalty_diag_bot += 1
 
-        return value
\ No newline at end of file
+        return value
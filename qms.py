@@ -1,5 +1,14 @@
+import numpy as np
+
 import utils
+import problem_generator
 import classicalMetropolis
+import vectorizedMetropolis
+import lazyMetropolis
+import exactMetropolis
+import quantumWalkMetropolis
+from lazy_landscape import LazyLandscape
+from shared_tables import SharedTables
 #import quantumMetropolis
 
 class QMS:
@@ -10,34 +19,98 @@ class QMS:
 
         self.is_circular = is_circular
 
-        self.successor_generation_mode = self.tools.find_successor_generation(energies)
-
-        self.deltas = self.tools.calculateAllDeltasOfRotations(energies, self.is_circular, self.successor_generation_mode)
+        # arrays of the deltas tables published in shared memory while there are worker processes (see share_tables)
+        self.shared_tables = None
+
+        # energies can be an array indexed by the Lehmer rank of the permutations (compact representation), a problem generator
+        # (the energies are streamed in blocks to the tables), a lazy landscape or a dict with string keys
+        with self.tools.metrics.phase('calculate_deltas'):
+            if isinstance(energies, problem_generator.Problem_generator):
+                self.successor_generation_mode = 'swap'
+                self.deltas = self.tools.calculate_streamed_delta_tables(energies, self.is_circular)
+            elif isinstance(energies, LazyLandscape):
+                self.successor_generation_mode = 'swap'
+                self.deltas = self.tools.calculate_lazy_deltas(energies)
+            elif isinstance(energies, np.ndarray):
+                self.successor_generation_mode = 'swap'
+                self.deltas = self.tools.calculate_delta_tables(energies, self.is_circular)
+            else:
+                self.successor_generation_mode = self.tools.find_successor_generation(energies)
+                self.deltas = self.tools.calculateAllDeltasOfRotations(energies, self.is_circular, self.successor_generation_mode)
         
+    def share_tables(self):
+
+        # only the arrays indexed by state are shared, the rest of the deltas are small and they are pickled
+        self.shared_tables = SharedTables({name: self.deltas[name] for name in ['energies', 'deltas', 'successors'] if isinstance(self.deltas.get(name), np.ndarray)})
+
+    def release_tables(self):
+
+        self.shared_tables.release()
+        self.shared_tables = None
+
+    def __getstate__(self):
+
+        state = self.__dict__.copy()
+        if self.shared_tables != None:
+            state['deltas'] = {name: value for name, value in self.deltas.items() if name not in self.shared_tables.descriptions}
+
+        return state
+
+    def __setstate__(self, state):
+
+        self.__dict__.update(state)
+        if self.shared_tables != None:
+            self.deltas.update(self.shared_tables.attach())
+
     def execute_quantum_metropolis(self, mode):
 
         print('    ⬤ Calculating probabilities with Quantum Metropolis')
-        probability_maxtrix_dict = self._quantum_metropolis()
+        with self.tools.metrics.phase('quantum_metropolis'):
+            probability_maxtrix_dict = self._quantum_metropolis()
+
+        # the oracles of all betas are built by the quantum pipeline, the hit rate of the cache is reported if it was used
+        if self.tools.oracle_cache != None:
+            self.tools.oracle_cache.report()
         
         if mode == 'TTS':
             print('    ⬤ Calculating TTS results for Quantum Metropolis')
-            return self.tools.calculate_tts_from_probability_matrix(probability_maxtrix_dict, self.deltas['indexes_min_energy'], self.tools.config_variables['precision_solution'])
+            with self.tools.metrics.phase('calculate_tts'):
+                return self.tools.calculate_tts_from_probability_matrix(probability_maxtrix_dict, self.deltas['indexes_min_energy'], self.tools.config_variables['precision_solution'])
         elif mode == 'probabilities':
             return probability_maxtrix_dict
 
-    def execute_classical_metropolis(self, mode):
+    def execute_classical_metropolis(self, mode, number_workers=None):
 
         print('    ⬤ Calculating probabilities with Classical Metropolis')
-        probability_maxtrix_dict = self._classical_metropolis()
+        with self.tools.metrics.phase('classical_metropolis'):
+            counts_dict = self._classical_metropolis(number_workers)
 
+        # the classical engines return count histograms, the probabilities are only calculated if they are requested
         if mode == 'TTS':
             print('    ⬤ Calculating TTS results for Classical Metropolis')
-            return self.tools.calculate_tts_from_probability_matrix(probability_maxtrix_dict, self.deltas['indexes_min_energy'], self.tools.config_variables['precision_solution'])
+            with self.tools.metrics.phase('calculate_tts'):
+                return self.tools.calculate_tts_from_probability_matrix(counts_dict, self.deltas['indexes_min_energy'], self.tools.config_variables['precision_solution'])
         elif mode == 'probabilities':
-            return probability_maxtrix_dict
+            return {step: self.tools.counts_to_probabilities(counts_dict[step]) for step in counts_dict.keys()}
+        elif mode == 'counts':
+            return counts_dict
+        elif mode == 'TTS_statistics':
+            return self.tools.calculate_tts_statistics_from_counts(counts_dict, self.deltas['indexes_min_energy'], self.tools.config_variables['precision_solution'], self.tools.config_variables['adaptive_confidence'])
 
     def _quantum_metropolis(self):
 
+        # the open version emulates the quantum walk with the tables of all states (the circuits of the quantum pipelines are not included)
+        if self.tools.config_variables['quantum_engine'] == 'walk':
+
+            if 'permutation_space' not in self.deltas:
+                raise ValueError('<*> ERROR: Quantum walk engine needs the energies as an array indexed by the rank of the permutations')
+
+            qm = quantumWalkMetropolis.QuantumWalkMetropolis(self.deltas, self.tools, self.is_circular, self.successor_generation_mode)
+
+            probabilities_dict = qm.execute_metropolis()
+            qm.report_metrics()
+
+            return probabilities_dict
 
         #qm = quantumMetropolis.QuantumMetropolis(self.deltas, self.tools, self.is_circular, self.successor_generation_mode)
         #return qm.execute_quantum_metropolis()
@@ -46,10 +119,53 @@ class QMS:
 
         raise Exception("Open version does not include quantum pipelines")
 
+    def _classical_metropolis(self, number_workers=None):
+
+        is_tables = 'permutation_space' in self.deltas
+
+        # the adaptive sampling is only implemented by the engines that execute the chains in batches (vectorized and lazy)
+        if self.tools.config_variables['adaptive_sampling'] and 'landscape' not in self.deltas and self.tools.config_variables['classical_engine'] != 'vectorized':
+            raise ValueError('<*> ERROR: Adaptive sampling is only supported by the vectorized and lazy engines but the classical engine is', self.tools.config_variables['classical_engine'])
+
+        # the lazy landscape does not have tables of all states, it is only executed by the lazy engine
+        if 'landscape' in self.deltas:
+            cm = lazyMetropolis.LazyMetropolis(self.deltas, self.tools, self.is_circular, self.successor_generation_mode, number_workers)
+
+        elif self.tools.config_variables['classical_engine'] == 'iterative':
+
+            # the iterative engine reads the tables directly (the chains are ranks) or the dict with string keys (the chains are coords)
+            # the counts of the ranks are converted to count arrays indexed by rank like the results of the other engines
+            cm = classicalMetropolis.ClassicalMetropolis(self.deltas if is_tables else self.deltas['deltas'], self.tools, self.is_circular, self.successor_generation_mode, number_workers)
+
+            counts_dict = cm.execute_metropolis()
+            cm.report_metrics()
+            if is_tables:
+                for step in counts_dict.keys():
+                    counts = np.zeros(self.deltas['permutation_space'].size, dtype=np.int64)
+                    np.add.at(counts, list(counts_dict[step].keys()), list(counts_dict[step].values()))
+                    counts_dict[step] = counts
+
+            return counts_dict
+
+        elif self.tools.config_variables['classical_engine'] == 'vectorized':
+
+            if not is_tables:
+                raise ValueError('<*> ERROR: Vectorized engine needs the energies as an array indexed by the rank of the permutations')
+
+            cm = vectorizedMetropolis.VectorizedMetropolis(self.deltas, self.tools, self.is_circular, self.successor_generation_mode, number_workers)
+
+        elif self.tools.config_variables['classical_engine'] == 'exact':
+
+            if not is_tables:
+                raise ValueError('<*> ERROR: Exact engine needs the energies as an array indexed by the rank of the permutations')
 
+            # the exact engine returns the probability of each state instead of count histograms (both are normalized in the same way)
+            cm = exactMetropolis.ExactMetropolis(self.deltas, self.tools, self.is_circular, self.successor_generation_mode, number_workers)
 
-    def _classical_metropolis(self):
+        else:
+            raise ValueError('<*> ERROR: Classical engine wrong value. It should be one of [iterative, vectorized, exact] but it is', self.tools.config_variables['classical_engine'])
 
-        cm = classicalMetropolis.ClassicalMetropolis(self.deltas['deltas'], self.tools, self.is_circular, self.successor_generation_mode)
+        counts_dict = cm.execute_metropolis()
+        cm.report_metrics()
 
-        return cm.execute_metropolis()
\ No newline at end of file
+        return counts_dict
\ No newline at end of file
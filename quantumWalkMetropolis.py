@@ -0,0 +1,109 @@
+import numpy as np
+import time
+import datetime
+
+from exactMetropolis import ExactMetropolis
+from annealing_schedule import AnnealingSchedule, acceptance_probabilities
+
+class QuantumWalkMetropolis(ExactMetropolis):
+
+    # emulation of the quantum metropolis with the szegedy walk of the metropolis transition matrix (without a circuit simulator)
+    # the walk is in the space of the edges (x, y) of the transitions: |x>|y> has the amplitude of going from x to y
+    # one step is the szegedy operator R_B R_A = (S R_A)^2, where R_A = 2 Pi_A - I reflects in the space of the states
+    # |psi_x> = |x> sum_y sqrt(P(x, y)) |y> and S swaps the registers (|x>|y> -> |y>|x>)
+    # the amplitudes are real (P is real and the operators only reflect and swap), so the state is a real vector of edges
+    def __init__(self, deltas_tables, tools, is_circular, successor_generation_mode, number_workers=None):
+
+        super().__init__(deltas_tables, tools, is_circular, successor_generation_mode, number_workers)
+
+        # the quantum metropolis uses the beta of the quantum version
+        self.beta = self.tools.config_variables['beta_quantum']
+        self.schedule = AnnealingSchedule(self.beta, self.beta_type, self.annealing_schedule, self.alpha, self.number_coordinates, self.final_step)
+
+        self.calculate_edges()
+
+    def calculate_edges(self):
+
+        # the edges are the moves with probability > 0 to other states and the edge of each state with itself (rejected moves)
+        # they do not depend on beta (exp(-beta*delta) > 0), only their amplitudes change with beta
+        number_moves = self.successors.shape[1]
+        states = np.repeat(np.arange(self.number_states, dtype=np.int64), number_moves)
+        successors = np.asarray(self.successors, dtype=np.int64).ravel()
+        is_transition = (np.tile(self.move_probabilities, self.number_states) > 0) & (successors != states)
+
+        self.edge_keys = np.union1d(states[is_transition] * self.number_states + successors[is_transition], np.arange(self.number_states, dtype=np.int64) * (self.number_states + 1))
+        self.edge_sources = self.edge_keys // self.number_states
+        edge_targets = self.edge_keys % self.number_states
+
+        # the edge of each move (-1 if the move is not a transition, its probability goes to the edge of the state with itself)
+        self.move_edges = np.full(len(states), -1, dtype=np.int64)
+        self.move_edges[is_transition] = np.searchsorted(self.edge_keys, states[is_transition] * self.number_states + successors[is_transition])
+        self.loop_edges = np.searchsorted(self.edge_keys, np.arange(self.number_states, dtype=np.int64) * (self.number_states + 1))
+
+        # the moves are reversible (the inverse of a swap is the same swap), so the edge (y, x) exists for each edge (x, y)
+        self.swapped_edges = np.searchsorted(self.edge_keys, edge_targets * self.number_states + self.edge_sources)
+        if not np.array_equal(self.edge_keys[self.swapped_edges], edge_targets * self.number_states + self.edge_sources):
+            raise ValueError('<*> ERROR: Quantum walk needs reversible moves (the inverse of each transition should be a transition)')
+
+        # sqrt(P(x, y)) of each edge for each different beta value
+        self.edge_amplitudes = {}
+
+    def get_edge_amplitudes(self, beta_value):
+
+        if beta_value not in self.edge_amplitudes:
+
+            # the same transition probabilities than the exact metropolis (the moves to the same state are added)
+            transitions = (acceptance_probabilities(beta_value, self.deltas) * self.move_probabilities).ravel()
+            is_transition = self.move_edges >= 0
+
+            probabilities = np.bincount(self.move_edges[is_transition], weights=transitions[is_transition], minlength=len(self.edge_keys))
+            probabilities[self.loop_edges] = np.maximum(1 - np.bincount(self.edge_sources, weights=probabilities, minlength=self.number_states), 0)
+
+            self.edge_amplitudes[beta_value] = np.sqrt(probabilities)
+
+        return self.edge_amplitudes[beta_value]
+
+    def reflect_states(self, walk_state, amplitudes):
+
+        # R_A = 2 sum_x |psi_x><psi_x| - I
+        projections = np.bincount(self.edge_sources, weights=amplitudes * walk_state, minlength=self.number_states)
+
+        return 2 * amplitudes * projections[self.edge_sources] - walk_state
+
+    def execute_walk_step(self, walk_state, beta_value):
+
+        amplitudes = self.get_edge_amplitudes(beta_value)
+
+        walk_state = self.reflect_states(walk_state, amplitudes)[self.swapped_edges]
+        walk_state = self.reflect_states(walk_state, amplitudes)[self.swapped_edges]
+
+        return walk_state
+
+    def measure_states(self, walk_state):
+
+        # probability of measuring each state in the first register
+        return np.bincount(self.edge_sources, weights=walk_state**2, minlength=self.number_states)
+
+    def execute_metropolis(self, fixed_state=0):
+
+        time_start = time.time()
+
+        # the same initial distribution than the exact metropolis
+        distribution = self.calculate_initial_distribution(fixed_state)
+
+        # initial state: sum_x sqrt(distribution(x)) |psi_x> with the walk of the first beta
+        walk_state = np.sqrt(distribution)[self.edge_sources] * self.get_edge_amplitudes(self.calculate_beta_value(1))
+
+        # the result of each step is the probability of measuring each state (an array indexed by state id like the exact metropolis)
+        probabilities_dict = {}
+        if self.initial_step == 0: probabilities_dict[0] = distribution
+
+        for i in range(1, self.final_step+1):
+
+            walk_state = self.execute_walk_step(walk_state, self.calculate_beta_value(i))
+
+            if i >= self.initial_step: probabilities_dict[i] = self.measure_states(walk_state)
+
+        print("<i> Quantum Walk Metropolis => Steps", self.initial_step, "to", self.final_step, "calculated in", str(datetime.timedelta(seconds=time.time() - time_start)), "(hh:mm:ss)")
+
+        return probabilities_dict
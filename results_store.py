@@ -0,0 +1,89 @@
+import os
+import json
+import time
+import sqlite3
+
+# columns of the results that can be used to select rows (each one has an index)
+INDEXED_COLUMNS = ['number_queens', 'metropolis', 'engine', 'schedule', 'beta', 'seed', 'step']
+
+class ResultsStore:
+
+    # sqlite database with the tts of each step of each execution (main, sweep or imported from the old text files)
+    # runs: one row for each execution, results: one row for each step of each metropolis (classical/quantum) of an execution
+    def __init__(self, path):
+
+        self.path = path
+
+        if os.path.dirname(self.path) != '':
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self.connection = sqlite3.connect(self.path)
+
+        with self.connection:
+            self.connection.execute('CREATE TABLE IF NOT EXISTS runs (run_id INTEGER PRIMARY KEY AUTOINCREMENT, label TEXT, parameters TEXT, created REAL)')
+            self.connection.execute('CREATE TABLE IF NOT EXISTS results (run_id INTEGER, number_queens INTEGER, metropolis TEXT, engine TEXT, schedule TEXT, beta REAL, seed INTEGER, step INTEGER, tts REAL)')
+
+            self.connection.execute('CREATE INDEX IF NOT EXISTS results_run_id ON results (run_id)')
+            for column in INDEXED_COLUMNS:
+                self.connection.execute('CREATE INDEX IF NOT EXISTS results_' + column + ' ON results (' + column + ')')
+
+    def close(self):
+
+        self.connection.close()
+
+    def create_run(self, label, parameters=None):
+
+        with self.connection:
+            cursor = self.connection.execute('INSERT INTO runs (label, parameters, created) VALUES (?, ?, ?)', (label, json.dumps(parameters if parameters != None else {}), time.time()))
+
+        return cursor.lastrowid
+
+    def add_results(self, run_id, number_queens, metropolis, engine, schedule, beta, seed, tts_dict):
+
+        # tts_dict is the tts of each step (the step is None if it is not known)
+        rows = [(run_id, number_queens, metropolis, engine, schedule, beta, seed, int(step) if step != None else None, float(tts)) for step, tts in tts_dict.items()]
+
+        with self.connection:
+            self.connection.executemany('INSERT INTO results (run_id, number_queens, metropolis, engine, schedule, beta, seed, step, tts) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+    def has_label(self, label):
+
+        return self.connection.execute('SELECT 1 FROM runs WHERE label = ? LIMIT 1', (label,)).fetchone() != None
+
+    def count_runs(self):
+
+        return self.connection.execute('SELECT COUNT(*) FROM runs').fetchone()[0]
+
+    def query_minimum_tts(self, exclude_labels=[], **filters):
+
+        # minimum tts of each run and metropolis of the rows that have the values of the filters (columns of INDEXED_COLUMNS)
+        # the result is a list of (run_id, number_queens, metropolis, engine, minimum tts) sorted by number of queens and run
+        for column in filters.keys():
+            if column not in INDEXED_COLUMNS:
+                raise ValueError('<*> ERROR: The results can not be filtered by', column, '. The indexed columns are', INDEXED_COLUMNS)
+
+        conditions = ['results.' + column + ' = ?' for column in filters.keys()] + ['runs.label NOT IN (' + ', '.join('?' * len(exclude_labels)) + ')']
+        query = 'SELECT results.run_id, results.number_queens, results.metropolis, results.engine, MIN(results.tts) FROM results JOIN runs ON runs.run_id = results.run_id WHERE ' + ' AND '.join(conditions) + ' GROUP BY results.run_id, results.number_queens, results.metropolis, results.engine ORDER BY results.number_queens, results.run_id'
+
+        return self.connection.execute(query, list(filters.values()) + list(exclude_labels)).fetchall()
+
+    def read_quantum_classical_data(self, **filters):
+
+        # minimum tts of the classical and the quantum metropolis of each run with both of them: {number_queens: {run_id: {'classical': tts, 'quantum': tts}}}
+        data = {}
+        for run_id, number_queens, metropolis, _, minimum_tts in self.query_minimum_tts(**filters):
+            data.setdefault(str(number_queens), {}).setdefault(str(run_id), {})[metropolis] = minimum_tts
+
+        return {number_queens: {run_id: values for run_id, values in runs.items() if len(values) == 2} for number_queens, runs in data.items()}
+
+    def import_results_file(self, path, number_queens, engine, label):
+
+        # old text files: json with the minimum classical and quantum tts of each sample (the steps and parameters were not saved)
+        with open(path) as json_file:
+            data = json.load(json_file)
+
+        for sample, values in data.items():
+
+            run_id = self.create_run(label, {'sample': sample})
+            self.add_results(run_id, number_queens, 'classical', None, None, None, None, {None: values['classical']})
+            self.add_results(run_id, number_queens, 'quantum', engine, None, None, None, {None: values['quantum']})
@@ -0,0 +1,63 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+class SharedTables:
+
+    # the arrays are copied once to shared memory blocks, the pickled object only contains the names of the blocks
+    # the worker processes attach read only views of the same memory (there is no copy of the tables in each worker)
+    # empty_arrays are (shape, dtype) of arrays that are not copied, they are filled by the workers (see attach with writeable)
+    def __init__(self, arrays, empty_arrays={}):
+
+        self.descriptions = {}
+        self.memories = {}
+        self.is_owner = True
+
+        for name, array in arrays.items():
+
+            memory = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=memory.buf)[...] = array
+
+            self.memories[name] = memory
+            self.descriptions[name] = (memory.name, array.shape, array.dtype.str)
+
+        for name, (shape, dtype) in empty_arrays.items():
+
+            memory = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1))
+
+            self.memories[name] = memory
+            self.descriptions[name] = (memory.name, shape, np.dtype(dtype).str)
+
+    def __getstate__(self):
+
+        return {'descriptions': self.descriptions}
+
+    def __setstate__(self, state):
+
+        self.descriptions = state['descriptions']
+        self.memories = {}
+        self.is_owner = False
+
+    def attach(self, writeable=False):
+
+        arrays = {}
+        for name, (memory_name, shape, dtype) in self.descriptions.items():
+
+            # the memory object is kept while the process is alive, the views are not valid without it
+            # (the owner uses its own blocks)
+            if name not in self.memories:
+                self.memories[name] = shared_memory.SharedMemory(name=memory_name)
+
+            arrays[name] = np.ndarray(shape, dtype=dtype, buffer=self.memories[name].buf)
+            arrays[name].flags.writeable = writeable
+
+        return arrays
+
+    def release(self):
+
+        # only the process that created the blocks removes them (when all workers have finished)
+        if self.is_owner:
+            for memory in self.memories.values():
+                memory.close()
+                memory.unlink()
+
+        self.memories = {}
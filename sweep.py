@@ -0,0 +1,34 @@
+import utils
+import parameter_sweep
+import time
+import json
+import datetime
+
+
+def main():
+
+    print('\n###################################################################')
+    print('##                    QMS Open Source Software                   ##')
+    print('##                                                               ##')
+    print('##         Parameter sweep of the classical metropolis           ##')
+    print('###################################################################\n')
+
+    time_start = time.time()
+
+    #Read config file with the QFold configuration variables
+    config_path = './config/config.json'
+    tools = utils.Utils(config_path)
+
+    args = tools.parse_sweep_arguments()
+
+    with open(args.grid) as json_file:
+        grid = json.load(json_file)
+
+    sweep = parameter_sweep.ParameterSweep(tools, grid, args.output, args.workers, args.seed)
+    sweep.execute_sweep()
+
+    print("<i> Parameter sweep => Calculated in", str(datetime.timedelta(seconds=time.time() - time_start)), "(hh:mm:ss)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+
+class TablesCache:
+
+    def __init__(self, cache_path, metrics=None):
+
+        self.cache_path = cache_path
+        self.metrics = metrics
+
+    # the directory of some tables is identified by the hash of all the parameters used to calculate them
+    def get_directory(self, kind, parameters):
+
+        digest = hashlib.sha256(json.dumps(parameters, sort_keys=True).encode()).hexdigest()[:16]
+
+        return os.path.join(self.cache_path, kind + '_' + digest)
+
+    def load(self, kind, parameters):
+
+        directory = self.get_directory(kind, parameters)
+
+        # parameters.json is written at the end, the directory is not complete without it
+        if not os.path.isfile(os.path.join(directory, 'parameters.json')):
+            if self.metrics != None: self.metrics.count('tables_cache_misses_' + kind)
+            return None
+
+        if self.metrics != None: self.metrics.count('tables_cache_hits_' + kind)
+
+        # the arrays are memory mapped (read only), they are only loaded when they are used
+        arrays = {}
+        for file_name in os.listdir(directory):
+            if file_name.endswith('.npy'):
+                arrays[file_name[:-4]] = np.load(os.path.join(directory, file_name), mmap_mode='r')
+
+        return arrays
+
+    def save(self, kind, parameters, arrays):
+
+        directory = self.get_directory(kind, parameters)
+        temp_directory = directory + '.tmp' + str(os.getpid())
+
+        os.makedirs(temp_directory, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(os.path.join(temp_directory, name + '.npy'), np.asarray(array))
+
+        with open(os.path.join(temp_directory, 'parameters.json'), 'w') as outfile:
+            json.dump(parameters, outfile)
+
+        # the complete directory is renamed at once, if other process saved the same tables the temp directory is discarded
+        try:
+            os.rename(temp_directory, directory)
+        except OSError:
+            shutil.rmtree(temp_directory)
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+# the modules of qms are in the root of the repository (they are executed from there)
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_PATH)
+
+import utils
+
+@pytest.fixture
+def tools():
+
+    # tools with the config file of the repository, without the caches and the results store (nothing is written outside the test)
+    tools = utils.Utils(os.path.join(ROOT_PATH, 'config', 'config.json'))
+    tools.config_variables['tables_cache'] = False
+    tools.config_variables['oracle_cache'] = False
+    tools.config_variables['results_store_path'] = ''
+    tools.fixed_position_queen = [-1, -1]
+
+    return tools
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+import problem_generator
+import qms
+import vectorizedMetropolis
+
+NUMBER_QUEENS = 5
+
+@pytest.fixture
+def solver(tools):
+
+    tools.config_variables['classical_engine'] = 'vectorized'
+    tools.config_variables['adaptive_sampling'] = True
+    tools.config_variables['metropolis_batch_size'] = 1000
+    tools.config_variables['adaptive_max_samples'] = 100000
+
+    return qms.QMS(problem_generator.Problem_generator(number_queens=NUMBER_QUEENS), False, tools)
+
+def test_adaptive_sampling_stops_when_the_interval_is_narrow(tools, solver):
+
+    # p_t is about 0.25 with n=5, a tolerance of 10% is reached with a few batches (far from the budget)
+    tools.config_variables['adaptive_tolerance'] = 0.1
+
+    np.random.seed(1234)
+    statistics = solver.execute_classical_metropolis(mode='TTS_statistics', number_workers=1)
+
+    assert list(statistics.keys()) == list(range(tools.config_variables['initial_step'], tools.config_variables['final_step']+1))
+    for step_statistics in statistics.values():
+
+        assert sorted(step_statistics.keys()) == ['p_t', 'samples', 'tts', 'tts_interval']
+        assert 0 < step_statistics['samples'] < tools.config_variables['adaptive_max_samples']
+        assert step_statistics['samples'] % tools.config_variables['metropolis_batch_size'] == 0
+
+        tts_low, tts_high = step_statistics['tts_interval']
+        assert tts_low <= step_statistics['tts'] <= tts_high
+        assert (tts_high - tts_low) / step_statistics['tts'] < tools.config_variables['adaptive_tolerance']
+
+def test_adaptive_sampling_without_successes_uses_all_samples(tools, solver):
+
+    tools.config_variables['adaptive_tolerance'] = 1
+    tools.config_variables['adaptive_max_samples'] = 5000
+
+    # without min energy states there are no successes, the sampling only stops at the budget
+    solver.deltas['indexes_min_energy'] = np.array([], dtype=np.int64)
+
+    np.random.seed(1234)
+    statistics = solver.execute_classical_metropolis(mode='TTS_statistics', number_workers=1)
+
+    for step_statistics in statistics.values():
+        assert step_statistics['samples'] == 5000
+        assert step_statistics['tts'] == tools.config_variables['default_value_tts']
+
+def test_adaptive_sampling_needs_positive_budget(tools, solver):
+
+    tools.config_variables['adaptive_max_samples'] = 0
+
+    with pytest.raises(ValueError):
+        vectorizedMetropolis.VectorizedMetropolis(solver.deltas, tools, False, 'swap', 1)
@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+
+import problem_generator
+
+@pytest.mark.parametrize('number_queens', [5, 6])
+@pytest.mark.parametrize('fixed_position_queen', [[-1, -1], [1, 2]])
+def test_parallel_tables_match_serial_tables(tools, number_queens, fixed_position_queen):
+
+    tools.fixed_position_queen = fixed_position_queen
+    progen = problem_generator.Problem_generator(number_queens=number_queens)
+
+    # small blocks, so each partition of the parallel build is filled with several blocks
+    tables = {}
+    for number_workers in [1, 2]:
+        tools.config_variables['number_workers'] = number_workers
+        tables[number_workers] = tools.calculate_streamed_delta_tables(progen, False, block_size=7)
+
+    for name in ['energies', 'deltas', 'successors', 'indexes_min_energy']:
+        assert np.array_equal(tables[1][name], tables[2][name]), name
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+import problem_generator
+from permutation_space import PermutationSpace
+from constrained_space import ConstrainedSpace
+
+@pytest.mark.parametrize('number_queens', [4, 5, 6])
+@pytest.mark.parametrize('fixed_position_queen', [None, (1, 2)])
+def test_incremental_deltas_match_full_evaluation(number_queens, fixed_position_queen):
+
+    progen = problem_generator.Problem_generator(number_queens)
+    if fixed_position_queen == None:
+        permutation_space = PermutationSpace(number_queens)
+    else:
+        permutation_space = ConstrainedSpace(number_queens, *fixed_position_queen)
+
+    # all the states of the space and the energy of each one calculated queen by queen
+    permutations = permutation_space.all_permutations()
+    energies = np.array([progen.calculate_positions_value(permutation.tolist()) for permutation in permutations])
+
+    top_counts, bot_counts = progen.delta_evaluator.diagonal_counts(permutations)
+    assert np.array_equal(progen.delta_evaluator.energies_from_counts(top_counts, bot_counts), energies)
+
+    # each move of the space is the exchange of the queens of position and position+1
+    for position in permutation_space.swap_positions():
+
+        swapped_permutations = permutations.copy()
+        swapped_permutations[:, [position, position+1]] = swapped_permutations[:, [position+1, position]]
+        swapped_energies = np.array([progen.calculate_positions_value(permutation.tolist()) for permutation in swapped_permutations])
+
+        deltas = progen.delta_evaluator.swap_deltas(permutations, top_counts, bot_counts, position)
+        assert np.array_equal(deltas, swapped_energies - energies), position
@@ -0,0 +1,30 @@
+import numpy as np
+
+import problem_generator
+import lazy_landscape
+
+NUMBER_QUEENS = 6
+
+def test_cache_slots_match_dense_tables(tools):
+
+    # a cache much smaller than the 720 states, so the slots are evicted and reused many times
+    tools.config_variables['lazy_cache_size'] = 50
+
+    deltas_tables = tools.calculate_streamed_delta_tables(problem_generator.Problem_generator(number_queens=NUMBER_QUEENS), False)
+    landscape = lazy_landscape.LazyLandscape(NUMBER_QUEENS, tools)
+
+    np.random.seed(1234)
+    for _ in range(200):
+
+        # batches with repeated states and with states of the previous batches (hits, misses and evictions in the same call)
+        states = np.random.randint(0, deltas_tables['permutation_space'].size, size=np.random.randint(1, 80))
+        states = states[np.isin(states, np.unique(states)[:landscape.cache_size])]
+
+        slots = landscape.get_slots(states)
+
+        assert np.array_equal(landscape.deltas_slots[slots], deltas_tables['deltas'][states])
+        assert np.array_equal(landscape.successors_slots[slots], deltas_tables['successors'][states])
+
+    statistics = landscape.get_cache_statistics()
+    assert statistics['size'] == landscape.cache_size
+    assert statistics['hits'] > 0 and statistics['evictions'] > 0
@@ -0,0 +1,43 @@
+import math
+import numpy as np
+import pytest
+
+import problem_generator
+import qms
+
+NUMBER_QUEENS = 5
+
+def calculate_p_t(counts, indexes_min_energy):
+
+    # probability of the min energy states (the exact engine gives probabilities, the other engines give counts)
+    return counts[indexes_min_energy].sum() / counts.sum()
+
+@pytest.mark.parametrize('fixed_position_queen', [[-1, -1], [1, 3]])
+@pytest.mark.parametrize('step_sweep', [False, True])
+def test_sampling_engines_match_exact_engine(tools, fixed_position_queen, step_sweep):
+
+    tools.fixed_position_queen = fixed_position_queen
+    tools.config_variables['step_sweep'] = step_sweep
+    tools.config_variables['number_iterations'] = 10
+
+    solver = qms.QMS(problem_generator.Problem_generator(number_queens=NUMBER_QUEENS), False, tools)
+    indexes_min_energy = solver.deltas['indexes_min_energy']
+
+    tools.config_variables['classical_engine'] = 'exact'
+    probabilities = solver.execute_classical_metropolis(mode='counts', number_workers=1)
+
+    for engine in ['vectorized', 'iterative']:
+
+        tools.config_variables['classical_engine'] = engine
+        np.random.seed(1234)
+        counts = solver.execute_classical_metropolis(mode='counts', number_workers=1)
+
+        assert counts.keys() == probabilities.keys()
+        for step in counts.keys():
+
+            # the p_t of the chains is binomial around the exact p_t (5 standard deviations)
+            samples = counts[step].sum()
+            p_t_exact = calculate_p_t(probabilities[step], indexes_min_energy)
+            tolerance = 5 * math.sqrt(p_t_exact * (1 - p_t_exact) / samples)
+
+            assert abs(calculate_p_t(counts[step], indexes_min_energy) - p_t_exact) <= tolerance, (engine, step)
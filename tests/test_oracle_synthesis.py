@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('qiskit')
+
+import problem_generator
+from beta_precalc_TruthTableOracle import Beta_precalc_TruthTableOracle
+
+NUMBER_QUEENS = 4
+
+@pytest.fixture
+def oracle(tools):
+
+    # the same oracle than the benchmark suite (deltas dict of the swap moves)
+    energies = problem_generator.Problem_generator(NUMBER_QUEENS).generate_input()
+    deltas = tools.calculateAllDeltasOfRotations(energies, False, 'swap')
+
+    precision_coords = [int(np.ceil(np.log2(NUMBER_QUEENS)))] * NUMBER_QUEENS
+    in_bits = int(sum(precision_coords)) + int(np.ceil(np.log2(NUMBER_QUEENS))) + 1
+
+    return Beta_precalc_TruthTableOracle(deltas['deltas'], tools, in_bits, tools.config_variables['ancilla_bits'], precision_coords)
+
+@pytest.mark.parametrize('beta', [0.1, 1, 3, 10])
+def test_merged_synthesis_is_equivalent_to_mcx(oracle, beta):
+
+    comparison = oracle.compare_synthesis(beta)
+
+    assert comparison['is_equivalent']
+    assert comparison['merged']['size'] <= comparison['mcx']['size']
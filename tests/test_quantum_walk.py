@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+import problem_generator
+from quantumWalkMetropolis import QuantumWalkMetropolis
+
+NUMBER_QUEENS = 4
+
+def calculate_dense_states(transition_matrix):
+
+    # |psi_x> = |x> sum_y sqrt(P(x, y)) |y> in the space of all pairs |x>|y> (N^2 amplitudes), one column for each state
+    number_states = len(transition_matrix)
+    psi = np.zeros((number_states**2, number_states))
+    for state in range(number_states):
+        psi[state*number_states:(state+1)*number_states, state] = np.sqrt(transition_matrix[state])
+
+    return psi
+
+def calculate_dense_walk_step(transition_matrix):
+
+    # szegedy step S R_A S R_A, with R_A = 2 sum_x |psi_x><psi_x| - I and S the swap of the registers
+    number_states = len(transition_matrix)
+    psi = calculate_dense_states(transition_matrix)
+
+    reflection = 2 * psi @ psi.T - np.eye(number_states**2)
+    swap = np.eye(number_states**2).reshape(number_states, number_states, number_states**2).transpose(1, 0, 2).reshape(number_states**2, number_states**2)
+
+    return swap @ reflection @ swap @ reflection
+
+@pytest.mark.parametrize('annealing_schedule', ['linear', 'geometric'])
+def test_walk_matches_dense_szegedy_operator(tools, annealing_schedule):
+
+    tools.config_variables['beta_type'] = 'variable'
+    tools.config_variables['annealing_schedule'] = annealing_schedule
+
+    deltas_tables = tools.calculate_streamed_delta_tables(problem_generator.Problem_generator(number_queens=NUMBER_QUEENS), False)
+    walk = QuantumWalkMetropolis(deltas_tables, tools, False, 'swap')
+    probabilities_dict = walk.execute_metropolis()
+
+    # the rows of the transition matrix are the probabilities of going from each state (the exact engine propagates the transposed matrix)
+    def get_dense_transition_matrix(i):
+        return walk.get_transition_matrix(walk.calculate_beta_value(i)).T.toarray()
+
+    # random initialization: the walk starts in sum_x sqrt(1/N) |psi_x> of the first beta
+    number_states = walk.number_states
+    walk_state = calculate_dense_states(get_dense_transition_matrix(1)) @ np.full(number_states, np.sqrt(1 / number_states))
+
+    for i in range(1, walk.final_step+1):
+
+        walk_state = calculate_dense_walk_step(get_dense_transition_matrix(i)) @ walk_state
+
+        if i in probabilities_dict:
+            probabilities = (walk_state**2).reshape(number_states, number_states).sum(axis=1)
+
+            assert np.allclose(probabilities_dict[i], probabilities, atol=1e-12), i
+            assert np.isclose(probabilities_dict[i].sum(), 1, atol=1e-12), i
@@ -1,10 +1,29 @@
+import os
 import json
 import math
 import numpy as np
-from scipy.stats import vonmises
-import copy
+from scipy.stats import vonmises, norm
 import argparse
+from collections import Counter
 
+from permutation_space import PermutationSpace
+from constrained_space import ConstrainedSpace
+from tables_cache import TablesCache
+from oracle_cache import OracleCache
+from shared_tables import SharedTables
+from results_store import ResultsStore
+from metrics import Metrics
+from n_queen_solutions_generator import first_n_queen_solution, n_queen_solution_ranks
+import problem_generator
+import worker_pool
+
+def fill_tables_partition(partition):
+
+    # the arguments of the tables are sent once to each worker, the tables are in shared memory and each worker writes the rows of its partitions
+    # (the memory blocks are only opened in the first partition of each worker)
+    tools, progen, permutation_space, shared_tables, min_energy, block_size = worker_pool.get_worker_object()
+
+    return tools.fill_delta_blocks(shared_tables.attach(writeable=True), permutation_space, progen, min_energy, block_size, partition)
 
 class Utils:
 
@@ -13,6 +32,15 @@ class Utils:
         self.minimum_key_value = []
         self.maximum_key_value = []
 
+        # times and counters of the execution (they are saved with --metrics)
+        self.metrics = Metrics()
+
+        # the oracle cache keeps the last oracles in memory, so it is the same object for all the oracles
+        self.oracle_cache = None
+
+        # amplitudes of the von mises distribution of each (n_qubits, kappa)
+        self.von_mises_tables = {}
+
         if config_path != '':
             try:
                 f = open(config_path)
@@ -35,12 +63,46 @@ class Utils:
 
         parser.add_argument("-q", "--queen", help="position (column) of the queen to fix", type=int, nargs='?')
         parser.add_argument("-v", "--value", help="position (row) of the queen to fix", type=int, nargs='?')
+        parser.add_argument("-w", "--workers", help="number of processes to execute the classical metropolis (by default number_workers of the config file)", type=int, nargs='?')
+        parser.add_argument("--metrics", help="json file to save the time, memory and counters of each phase and step", nargs='?')
+        parser.add_argument("--profile", help="execute the classical metropolis with cProfile (the statistics are saved next to the metrics file)", action='store_true')
+        parser.add_argument("-s", "--seed", help="seed of the random numbers (it is saved with the results)", type=int, nargs='?')
 
         self.args = parser.parse_args()
         self.fixed_position_queen = [self.args.queen, self.args.value] if self.args.queen != None and self.args.value != None else [-1, -1]
 
         return self.args
 
+    def parse_sweep_arguments(self):
+
+        parser = argparse.ArgumentParser(description="Module to execute the classical metropolis for all combinations of a parameter grid: Example ./python3 sweep.py ./config/sweep.json")
+
+        parser.add_argument("grid", help="json file with the list of values of each parameter (number_queens and config variables)")
+
+        parser.add_argument("-o", "--output", help="json lines file with one record for each job (the jobs already in the file are not executed again)", default='./results/sweep_results.jsonl')
+        parser.add_argument("-w", "--workers", help="number of processes to execute the jobs (by default number_workers of the config file)", type=int, nargs='?')
+        parser.add_argument("-s", "--seed", help="seed of the sweep (the seed of each job is derived from it and from the job id, it is saved with the results)", type=int, nargs='?')
+
+        self.args = parser.parse_args()
+        self.fixed_position_queen = [-1, -1]
+
+        return self.args
+
+    def parse_benchmark_arguments(self):
+
+        parser = argparse.ArgumentParser(description="Module to measure the time and the peak memory of each stage of qms: Example ./python3 benchmark.py -s 4 5 6")
+
+        parser.add_argument("-s", "--sizes", help="numbers of queens of the benchmarks", type=int, nargs='+', default=[4, 5, 6, 7, 8, 9])
+        parser.add_argument("-o", "--output", help="json file with the results of the benchmarks", default='./results/benchmark.json')
+        parser.add_argument("-b", "--baseline", help="json file with the results to compare with (by default benchmark_baseline_path of the config file)", nargs='?')
+        parser.add_argument("-t", "--threshold", help="relative increase of time or memory considered a regression (by default benchmark_regression_threshold of the config file)", type=float, nargs='?')
+        parser.add_argument("--save-baseline", help="save the results as the new baseline", action='store_true')
+
+        self.args = parser.parse_args()
+        self.fixed_position_queen = [-1, -1]
+
+        return self.args
+
     # This method returns the json with all rotations and energies associated to these rotations
     # energies keys can contain hyphens ('-') to indicate that there is a group. For example '001 010' means that it is necessary to rotate (+/-1) 001 and then 010
     def calculateAllDeltasOfRotations(self, energies, is_circular, successor_generation_mode):
@@ -101,16 +163,292 @@ class Utils:
         deltasJson['initial_min_energy'] = min_energy
         deltasJson['indexes_min_energy'] = indexes_min_energy
 
-        with open('deltas.json', 'w') as outfile:
-            json.dump(deltasJson, outfile)
+        if self.config_variables['output_deltas_json']:
+            with open('deltas.json', 'w') as outfile:
+                json.dump(deltasJson, outfile)
+
+        return deltasJson
+
+    # This method returns the tables of energies, deltas and successors of a problem whose states are permutations
+    # energies is an array indexed by the Lehmer rank of the permutations (see PermutationSpace)
+    # deltas and successors have a column for each move, the move of a group is 2*group_id + plusminus (the same order than the deltas keys)
+    def calculate_delta_tables(self, energies, is_circular):
+
+        number_elements = 1
+        while math.factorial(number_elements) < len(energies): number_elements += 1
+
+        if math.factorial(number_elements) != len(energies):
+            raise ValueError('<*> ERROR: The number of energies', len(energies), 'is not the number of permutations of any number of elements')
+
+        permutation_space, cache_parameters, has_solutions = self.prepare_delta_tables(number_elements, is_circular)
+        min_energy = 0 if has_solutions else int(energies.min())
+
+        deltas_tables = self.load_delta_tables(permutation_space, cache_parameters, min_energy)
+        if deltas_tables == None:
+
+            # with a fixed queen, the tables only contain the (n-1)! states with the queen in its position
+            if isinstance(permutation_space, ConstrainedSpace):
+                energies = np.asarray(energies[permutation_space.complete_ranks])
+
+            # the states of minimum energy are the ranks of the solutions (they are not searched in the energies)
+            indexes_min_energy = self.calculate_solution_indexes(permutation_space) if has_solutions else None
+
+            deltas_tables = self.generate_delta_tables(permutation_space, energies, min_energy, indexes_min_energy)
+            self.save_delta_tables(cache_parameters, deltas_tables)
+
+        self.write_deltas_json(deltas_tables)
+
+        return deltas_tables
+
+    # This method returns the same tables than calculate_delta_tables, but the energies are not calculated before
+    # the problem generator produces blocks of permutations with their energies and the tables of each block are filled when it arrives
+    # so the only arrays of all states are the tables (there is no array of all permutations or of their Lehmer codes)
+    def calculate_streamed_delta_tables(self, progen, is_circular, block_size=100000):
+
+        permutation_space, cache_parameters, has_solutions = self.prepare_delta_tables(progen.number_queens, is_circular)
+
+        # without solutions (less than 4 queens) the minimum is searched in the energies of all permutations (they are only a few)
+        min_energy = 0 if has_solutions else int(progen.generate_energies().min())
+
+        deltas_tables = self.load_delta_tables(permutation_space, cache_parameters, min_energy)
+        if deltas_tables == None:
+
+            deltas_tables = self.stream_delta_tables(permutation_space, progen, min_energy, block_size, self.config_variables['number_workers'])
+            self.save_delta_tables(cache_parameters, deltas_tables)
+
+        self.write_deltas_json(deltas_tables)
+
+        return deltas_tables
+
+    def prepare_delta_tables(self, number_elements, is_circular):
+
+        # permutations are always generated by swap and all coords are in the range [0, n-1]
+        self.number_coordinates = number_elements
+        self.minimum_key_value = [0] * number_elements
+        self.maximum_key_value = [number_elements-1] * number_elements
+
+        # the tables are saved in the cache with all the parameters used to calculate them
+        cache_parameters = {'number_queens': number_elements, 'successor_generation_mode': 'swap', 'is_circular': is_circular, 'barrier_energy_value': self.config_variables['barrier_energy_value'], 'energy_function_version': problem_generator.ENERGY_FUNCTION_VERSION}
+
+        # with a fixed queen, the tables only contain the (n-1)! states with the queen in its position
+        if self.config_variables['constrained_state_space'] and self.fixed_position_queen[0] != -1:
+            permutation_space = ConstrainedSpace(number_elements, self.fixed_position_queen[0], self.fixed_position_queen[1])
+            cache_parameters['fixed_position_queen'] = self.fixed_position_queen
+        else:
+            permutation_space = PermutationSpace(number_elements)
+
+        # the energies are never negative and the boards without collisions (the n-queen solutions) have energy 0
+        # so the energies are only scanned if there are no solutions
+        # the minimum energy is the minimum of all permutations (the states with the fixed queen could not reach it)
+        has_solutions = first_n_queen_solution(number_elements) != None
+
+        return permutation_space, cache_parameters, has_solutions
+
+    def load_delta_tables(self, permutation_space, cache_parameters, min_energy):
+
+        tables_cache = self.get_tables_cache()
+        cached_arrays = tables_cache.load('deltas', cache_parameters) if tables_cache != None else None
+        if cached_arrays == None:
+            return None
+
+        print('    ⬤ Loading deltas tables from the cache')
+        return self.create_delta_tables(permutation_space, cached_arrays['energies'], cached_arrays['deltas'], cached_arrays['successors'], cached_arrays['indexes_min_energy'], min_energy)
+
+    def save_delta_tables(self, cache_parameters, deltas_tables):
+
+        tables_cache = self.get_tables_cache()
+        if tables_cache != None:
+            tables_cache.save('deltas', cache_parameters, {name: deltas_tables[name] for name in ['energies', 'deltas', 'successors', 'indexes_min_energy']})
+
+    def write_deltas_json(self, deltas_tables):
+
+        if self.config_variables['output_deltas_json']:
+            with open('deltas.json', 'w') as outfile:
+                json.dump(self.delta_tables_to_dict(deltas_tables), outfile)
+
+    def calculate_solution_indexes(self, permutation_space):
+
+        solution_ranks = n_queen_solution_ranks(permutation_space.number_elements, number_workers=self.config_variables['number_workers'])
+
+        # in the constrained space, only the solutions with the queen in its position are states (with their rank in the constrained space)
+        if isinstance(permutation_space, ConstrainedSpace):
+            return permutation_space.from_complete_ranks(solution_ranks[np.isin(solution_ranks, permutation_space.complete_ranks)])
+
+        return solution_ranks
+
+    def get_tables_cache(self):
+
+        return TablesCache(self.config_variables['tables_cache_path'], self.metrics) if self.config_variables['tables_cache'] else None
+
+    def get_oracle_cache(self):
+
+        if not self.config_variables['oracle_cache']:
+            return None
+
+        if self.oracle_cache == None:
+            self.oracle_cache = OracleCache(self.config_variables['oracle_cache_path'], self.config_variables['oracle_cache_size'], self.metrics)
+
+        return self.oracle_cache
+
+    def generate_delta_tables(self, permutation_space, energies, min_energy=None, indexes_min_energy=None):
+
+        number_elements = permutation_space.number_elements
+
+        print('    ⬤ Calculating deltas tables for all possible swaps')
+
+        ranks = np.arange(permutation_space.size, dtype=permutation_space.rank_dtype)
+        permutations = permutation_space.all_permutations()
+        codes = permutation_space.lehmer_codes(permutations)
+
+        # the moves out of the range (first group -1 and last group +1) have the barrier energy and they keep the same state
+        deltas = np.full((permutation_space.size, 2*number_elements), self.config_variables['barrier_energy_value'], dtype=np.int32)
+        successors = np.repeat(ranks[:, None], 2*number_elements, axis=1)
+
+        # the exchanges that are not in swap_positions (they move the fixed queen) keep the barrier energy and the same state
+        for position in permutation_space.swap_positions():
+
+            new_ranks = permutation_space.adjacent_swap_ranks(ranks, codes, permutations, position)
+            delta = energies[new_ranks] - energies
+
+            # exchange position and position+1 is the move +1 of the group position and the move -1 of the group position+1
+            for move in [2*position, 2*(position+1)+1]:
+                successors[:, move] = new_ranks
+                deltas[:, move] = delta
+
+        return self.create_delta_tables(permutation_space, energies, deltas, successors, indexes_min_energy, min_energy)
+
+    def stream_delta_tables(self, permutation_space, progen, min_energy, block_size=100000, number_workers=1):
+
+        number_elements = permutation_space.number_elements
+        shapes = {'energies': ((permutation_space.size,), np.int32), 'deltas': ((permutation_space.size, 2*number_elements), np.int32), 'successors': ((permutation_space.size, 2*number_elements), permutation_space.rank_dtype)}
+
+        if number_workers > 1 and permutation_space.number_partitions() > 1:
+            return self.stream_delta_tables_parallel(permutation_space, progen, min_energy, block_size, number_workers, shapes)
+
+        print('    ⬤ Calculating energies and deltas tables for all possible swaps (streaming blocks)')
+
+        tables = {name: np.empty(shape, dtype=dtype) for name, (shape, dtype) in shapes.items()}
+        indexes_min_energy = self.fill_delta_blocks(tables, permutation_space, progen, min_energy, block_size)
+
+        return self.create_delta_tables(permutation_space, tables['energies'], tables['deltas'], tables['successors'], indexes_min_energy, min_energy)
+
+    def stream_delta_tables_parallel(self, permutation_space, progen, min_energy, block_size, number_workers, shapes):
+
+        print('    ⬤ Calculating energies and deltas tables for all possible swaps (', number_workers, 'workers )')
+
+        # the states are divided by their first element, the states of each partition are consecutive rows of the tables
+        # the tables are created in shared memory and each worker fills the rows of its partitions (the results are the same than the serial tables)
+        shared_tables = SharedTables({}, shapes)
+        try:
+            with worker_pool.create_pool(min(number_workers, permutation_space.number_partitions()), (self, progen, permutation_space, shared_tables, min_energy, block_size)) as pool:
+                partitions_indexes = pool.map(fill_tables_partition, range(permutation_space.number_partitions()))
+
+            # the tables are copied out of the shared memory before it is released
+            tables = {name: np.array(array) for name, array in shared_tables.attach().items()}
+        finally:
+            shared_tables.release()
+
+        return self.create_delta_tables(permutation_space, tables['energies'], tables['deltas'], tables['successors'], np.concatenate(partitions_indexes), min_energy)
+
+    def fill_delta_blocks(self, tables, permutation_space, progen, min_energy, block_size, partition=None):
+
+        # the rows of the blocks of the partition (all the blocks if there is no partition) are filled when each block arrives
+        # the result is the states of the blocks with the minimum energy
+        indexes_min_energy = []
+
+        for first_rank, permutations, block_energies, diagonal_counts in progen.generate_blocks(permutation_space, block_size, partition):
+
+            rows = slice(first_rank, first_rank+len(permutations))
+            ranks = np.arange(first_rank, first_rank+len(permutations), dtype=permutation_space.rank_dtype)
+            codes = permutation_space.lehmer_codes(permutations)
+
+            tables['energies'][rows] = block_energies
+            indexes_min_energy.append(first_rank + np.flatnonzero(block_energies == min_energy))
+
+            # the moves out of the range (first group -1 and last group +1) and the exchanges of the fixed queen have the barrier energy and they keep the same state
+            tables['deltas'][rows] = self.config_variables['barrier_energy_value']
+            tables['successors'][rows] = ranks[:, None]
+
+            # the deltas are calculated from the block (the energies of the new states could not be calculated yet)
+            for position in permutation_space.swap_positions():
+
+                new_ranks = permutation_space.adjacent_swap_ranks(ranks, codes, permutations, position)
+                delta = progen.calculate_swap_deltas(permutations, diagonal_counts, position)
+
+                for move in [2*position, 2*(position+1)+1]:
+                    tables['successors'][rows, move] = new_ranks
+                    tables['deltas'][rows, move] = delta
+
+        return np.concatenate(indexes_min_energy) if len(indexes_min_energy) > 0 else np.array([], dtype=np.int64)
+
+    def create_delta_tables(self, permutation_space, energies, deltas, successors, indexes_min_energy=None, min_energy=None):
+
+        if min_energy is None:
+            min_energy = int(energies.min())
+        if indexes_min_energy is None:
+            indexes_min_energy = np.flatnonzero(energies == min_energy)
+
+        deltas_tables = {}
+        deltas_tables['permutation_space'] = permutation_space
+        deltas_tables['energies'] = energies
+        deltas_tables['deltas'] = deltas
+        deltas_tables['successors'] = successors
+        deltas_tables['initial_min_energy'] = min_energy
+        deltas_tables['indexes_min_energy'] = [int(index) for index in indexes_min_energy]
+
+        return deltas_tables
+
+    # This method returns the deltas of a lazy landscape, the deltas and successors are calculated when a state is visited (see LazyLandscape)
+    def calculate_lazy_deltas(self, landscape):
+
+        number_elements = landscape.number_queens
+
+        # permutations are always generated by swap and all coords are in the range [0, n-1]
+        self.number_coordinates = number_elements
+        self.minimum_key_value = [0] * number_elements
+        self.maximum_key_value = [number_elements-1] * number_elements
+
+        print('    ⬤ Calculating minimum energy states from the n-queen solutions')
+
+        indexes_min_energy = landscape.get_indexes_min_energy()
+        if len(indexes_min_energy) == 0:
+            raise ValueError('<*> ERROR: The lazy landscape needs at least one solution to know the minimum energy states')
+
+        deltas_tables = {}
+        deltas_tables['landscape'] = landscape
+        deltas_tables['initial_min_energy'] = 0
+        deltas_tables['indexes_min_energy'] = indexes_min_energy
+
+        return deltas_tables
+
+    # convert the deltas tables to the deltas json with string keys (coord1-coord2-...|group_id|plusminus)
+    def delta_tables_to_dict(self, deltas_tables):
+
+        permutation_space = deltas_tables['permutation_space']
+        number_elements = permutation_space.number_elements
+
+        deltasJson = {}
+        deltasJson['deltas'] = {}
+
+        for rank, permutation in enumerate(permutation_space.all_permutations()):
+
+            key_groups = [str(element) for element in permutation]
+            for group_id in range(number_elements):
+                for plusminus in [0,1]:
+
+                    pm = (-2)*plusminus + 1
+                    if group_id+pm >= 0 and group_id+pm < number_elements:
+                        deltasJson['deltas'][self.generate_deltas_key(key_groups, group_id, plusminus)] = int(deltas_tables['deltas'][rank, 2*group_id + plusminus])
+
+        deltasJson['initial_min_energy'] = deltas_tables['initial_min_energy']
+        deltasJson['indexes_min_energy'] = [permutation_space.key(rank) for rank in deltas_tables['indexes_min_energy']]
 
         return deltasJson
 
     def generate_new_key(self, key_groups, group_id, pm, is_circular, successor_generation_mode):
 
-        # new key contains the key for the new energy
-        new_key = ''
-        new_key_groups = copy.deepcopy(key_groups)
+        # new key contains the key for the new energy (the groups are strings, a shallow copy is enough)
+        new_key_groups = list(key_groups)
 
         if successor_generation_mode == 'sequential':
 
@@ -131,21 +469,14 @@ class Utils:
             new_key_groups[group_id] = temp_value
             
 
-        # convert the list with the key to a string with - between numbers    
-        new_key = ''.join([key_number+'-' for key_number in new_key_groups])
-        return [new_key[:-1], new_value]
+        # convert the list with the key to a string with - between numbers
+        return ['-'.join(new_key_groups), new_value]
 
     def generate_deltas_key(self, key_groups, group_id, plusminus):
 
-            deltas_key = ''
+            # the groups of the key separated by -
+            deltas_key = '-'.join(key_groups)
 
-            # construct the new_key adding the new value of the group with the rest of the groups
-            for key_id in range(len(key_groups)):
-                deltas_key += str(key_groups[key_id]) + ' '
-            
-            # remove last whitespace
-            deltas_key = deltas_key.strip()
-            
             #Add the values to the file with the precalculated energies
             # if there is more than one group, add an id for the group that is modified
             if self.number_coordinates > 1: deltas_key += '|' + str(group_id)
@@ -153,8 +484,6 @@ class Utils:
             # add 0/1 for plus/minus
             deltas_key += '|' + str(plusminus)
 
-            deltas_key = deltas_key.replace(' ', '-')
-
             return deltas_key
 
     def calculate_tts_from_probability_matrix(self, probabilities_matrix_dict, indexes_min_energy, precision_solution):
@@ -166,26 +495,90 @@ class Utils:
             prob_matrix = probabilities_matrix_dict[step]
 
             p_t = 0
+            # the results can be count histograms (array indexed by state id or Counter), p_t is the count of the min energy states divided by the number of samples
+            if isinstance(prob_matrix, np.ndarray) or isinstance(prob_matrix, Counter):
+                successes, samples = self.count_min_energy_samples(prob_matrix, indexes_min_energy)
+                p_t = self.calculate_success_probability(successes, samples)
+
             # if one of the index of min energy calculated by psi 4 is in the results of metropolis, p_t is extracted (as a sum of all min_index)
             # else, the p_t is set to a very small value close to 0 (not 0 to avoid inf values)
-            for i_min_energy in indexes_min_energy:
+            else:
+                for i_min_energy in indexes_min_energy:
 
-                if i_min_energy in prob_matrix.keys():
-                    p_t += prob_matrix[i_min_energy]
+                    if i_min_energy in prob_matrix.keys():
+                        p_t += prob_matrix[i_min_energy]
 
-            result = 0
-            # Result is the calculated TTS
-            if p_t >= 0.999:
-                result = 1
-            elif p_t == 0 or p_t < 1e-10:
-                result = self.config_variables['default_value_tts']
-            else:
-                result = self.calculateTTS(precision_solution, step, p_t)
+            results[step] = self.calculate_tts_value(precision_solution, step, p_t)
 
-            results[step] = result
+        return results
+
+    # This method returns the TTS of each step with its confidence interval and the number of samples used (only for count histograms)
+    def calculate_tts_statistics_from_counts(self, counts_dict, indexes_min_energy, precision_solution, confidence):
+
+        results = {}
+
+        for step in counts_dict.keys():
+
+            successes, samples = self.count_min_energy_samples(counts_dict[step], indexes_min_energy)
+            tts, tts_low, tts_high = self.calculate_tts_interval(precision_solution, step, successes, samples, confidence)
+
+            results[step] = {'tts': tts, 'tts_interval': [tts_low, tts_high], 'p_t': self.calculate_success_probability(successes, samples), 'samples': samples}
 
         return results
 
+    def count_min_energy_samples(self, counts, indexes_min_energy):
+
+        if isinstance(counts, np.ndarray):
+            return counts[indexes_min_energy].sum().item(), counts.sum().item()
+
+        return sum(counts[i_min_energy] for i_min_energy in indexes_min_energy), sum(counts.values())
+
+    def calculate_success_probability(self, successes, samples):
+
+        # a step without samples (there are no chains, for example with 1 queen) has p_t = 0, so its TTS is the default value
+        return successes / samples if samples > 0 else 0
+
+    def calculate_tts_interval(self, precision_solution, step, successes, samples, confidence):
+
+        # without samples the interval is not defined, all its values are the default TTS
+        if samples == 0:
+            return (self.config_variables['default_value_tts'],) * 3
+
+        # Wilson score interval of p_t (it is valid even if there are no successes)
+        z = norm.ppf(1 - (1 - confidence)/2)
+        p_t = successes / samples
+
+        denominator = 1 + z**2 / samples
+        center = (p_t + z**2 / (2*samples)) / denominator
+        half_width = z * math.sqrt(p_t * (1-p_t) / samples + z**2 / (4*samples**2)) / denominator
+
+        # TTS decreases when p_t increases, so the upper bound of p_t is the lower bound of TTS
+        tts = self.calculate_tts_value(precision_solution, step, p_t)
+        tts_low = self.calculate_tts_value(precision_solution, step, min(1, center + half_width))
+        tts_high = self.calculate_tts_value(precision_solution, step, max(0, center - half_width))
+
+        return tts, tts_low, tts_high
+
+    def calculate_tts_value(self, precision_solution, step, p_t):
+
+        # Result is the calculated TTS
+        if p_t >= 0.999:
+            return 1
+        elif p_t == 0 or p_t < 1e-10:
+            return self.config_variables['default_value_tts']
+        else:
+            return self.calculateTTS(precision_solution, step, p_t)
+
+    # convert a count histogram (array indexed by state id or Counter, it can also be an exact probability array) to a dict with the probability of each produced state
+    def counts_to_probabilities(self, counts):
+
+        if isinstance(counts, np.ndarray):
+            total = counts.sum()
+            return {int(state): counts[state] / total for state in np.flatnonzero(counts)}
+
+        total = sum(counts.values())
+        return {state: count / total for state, count in counts.items()}
+
     def get_max_min_energy_indexes(self, energies):
 
         # get minimum and maximum value
@@ -205,30 +598,53 @@ class Utils:
 
     def von_mises_amplitudes(self, n_qubits, kappa):
 
-        probs = {}
-        probs[0] = vonmises.cdf(np.pi/2**n_qubits, kappa) - vonmises.cdf(-np.pi/2**n_qubits, kappa)
-        probs[2**n_qubits/2] = 2* vonmises.cdf(np.pi/2**n_qubits - np.pi, kappa)
-        
-        for i in range(1, 2**n_qubits//2):
-            p = vonmises.cdf((2*i+1)*np.pi/2**n_qubits, kappa)-vonmises.cdf((2*i-1)*np.pi/2**n_qubits, kappa)
-            probs[i] = p
-            probs[-i + 2**n_qubits ] = p
-
-        pr = []
-        aa = []
-        acc = []
-
-        for i in range(2**n_qubits):
-            pr.append(probs[i])
-
-        for i in range(2**n_qubits):
-            aa.append(np.sqrt(probs[i]))
-            acc.append(np.sum(pr[:i]))
-            
-        acc.append(np.sum(pr)) # This should append 1
-        acc = acc[1:] # We are not interested in the first item, which is 0
+        # the amplitudes are calculated once for each (n_qubits, kappa) (the lists are copied, the caller can modify them)
+        if (n_qubits, float(kappa)) not in self.von_mises_tables:
+            self.von_mises_tables[(n_qubits, float(kappa))] = self.load_von_mises_amplitudes(n_qubits, kappa)
+
+        amplitudes, cumulative = self.von_mises_tables[(n_qubits, float(kappa))]
+
+        return amplitudes.tolist(), cumulative.tolist()
+
+    def load_von_mises_amplitudes(self, n_qubits, kappa):
+
+        # the precomputed table of n_qubits is used if it contains this kappa (the kappas are not interpolated)
+        path = os.path.join(self.config_variables['von_mises_tables_path'], 'von_mises_' + str(n_qubits) + '.npz')
+        if self.config_variables['von_mises_tables_path'] != '' and os.path.isfile(path):
+
+            with np.load(path) as table:
+                indexes = np.flatnonzero(table['kappas'] == kappa)
+                if len(indexes) > 0:
+                    return table['amplitudes'][indexes[0]], table['cumulative'][indexes[0]]
+
+        return self.calculate_von_mises_amplitudes(n_qubits, kappa)
+
+    def calculate_von_mises_amplitudes(self, n_qubits, kappa):
+
+        number_bins = 2**n_qubits
+
+        # bin i (i < number_bins/2) is between the edges (2i-1)*pi/number_bins and (2i+1)*pi/number_bins and bin number_bins-i is its mirror
+        # the bin number_bins/2 contains both ends of the circle (from pi-pi/number_bins to -pi+pi/number_bins)
+        # all the edges are evaluated in one call of the cdf (the last one is the edge of the bin number_bins/2)
+        edges = (2*np.arange(number_bins//2 + 1) - 1) * np.pi/number_bins
+        cdf = vonmises.cdf(np.append(edges, np.pi/number_bins - np.pi), kappa)
 
-        return aa, acc
+        probabilities = np.empty(number_bins)
+        probabilities[:number_bins//2] = np.diff(cdf[:-1])
+        probabilities[number_bins//2] = 2*cdf[-1]
+        probabilities[number_bins//2 + 1:] = probabilities[1:number_bins//2][::-1]
+
+        # the last cumulative probability should be 1
+        return np.sqrt(probabilities), np.cumsum(probabilities)
+
+    def precompute_von_mises_tables(self, n_qubits, kappas):
+
+        # table of amplitudes for a grid of kappas, von_mises_amplitudes reads it instead of calculating the amplitudes of these kappas
+        tables = [self.calculate_von_mises_amplitudes(n_qubits, kappa) for kappa in kappas]
+
+        os.makedirs(self.config_variables['von_mises_tables_path'], exist_ok=True)
+        path = os.path.join(self.config_variables['von_mises_tables_path'], 'von_mises_' + str(n_qubits) + '.npz')
+        np.savez(path, kappas=np.asarray(kappas, dtype=float), amplitudes=np.array([table[0] for table in tables]), cumulative=np.array([table[1] for table in tables]))
 
     # method to find how to generate successor in the oracle (swap or sequential)
     def find_successor_generation(self, energies):
@@ -265,6 +681,31 @@ class Utils:
         else:
             raise Exception("Wrong direction value")
 
+    def save_results(self, label, number_queens, tts, config_variables=None, seed=None, run_id=None):
+
+        # tts is the tts of each step of each metropolis ({'classical': {step: tts}, 'quantum': {step: tts}})
+        # the results are appended to the results store with the parameters of the execution (config_variables, by default the config of the tools)
+        # with a run_id the results are added to a run that was already saved (the result is the id of the run)
+        if self.config_variables['results_store_path'] == '':
+            return None
+
+        config_variables = config_variables if config_variables != None else self.config_variables
+        schedule = config_variables['annealing_schedule'] if config_variables['beta_type'] == 'variable' else 'fixed'
+
+        results_store = ResultsStore(self.config_variables['results_store_path'])
+        try:
+            if run_id == None:
+                run_id = results_store.create_run(label, config_variables)
+            for metropolis, tts_dict in tts.items():
+
+                engine = config_variables['classical_engine'] if metropolis == 'classical' else config_variables['quantum_engine']
+                beta = config_variables['beta_classical'] if metropolis == 'classical' else config_variables['beta_quantum']
+                results_store.add_results(run_id, number_queens, metropolis, engine, schedule, beta, seed, tts_dict)
+        finally:
+            results_store.close()
+
+        return run_id
+
     def read_results_data(self, input_name):
 
         path = self.config_variables['path_tts_plot']+input_name
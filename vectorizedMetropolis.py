@@ -0,0 +1,220 @@
+import numpy as np
+import time
+import datetime
+
+from classicalMetropolis import ClassicalMetropolis
+
+class VectorizedMetropolis(ClassicalMetropolis):
+
+    def __init__(self, deltas_tables, tools, is_circular, successor_generation_mode, number_workers=None):
+
+        # the tables are loaded before the base constructor because the acceptance table is calculated from the deltas
+        self.load_tables(deltas_tables)
+
+        # the deltas dict of the iterative engine is not used, the tables are attributes of this engine
+        super().__init__(None, tools, is_circular, successor_generation_mode, number_workers)
+
+        if self.successor_generation_mode != 'swap':
+            raise ValueError('<*> ERROR: Vectorized Metropolis only supports permutation problems (swap mode) but the mode is', self.successor_generation_mode)
+
+        # number of chains that are advanced at the same time (each chain is a position of the states array)
+        self.batch_size = self.tools.config_variables['metropolis_batch_size']
+
+        # in adaptive mode the batches of each step are executed until the TTS confidence interval is narrow enough (or the samples budget is reached)
+        self.adaptive_sampling = self.tools.config_variables['adaptive_sampling']
+        self.adaptive_tolerance = self.tools.config_variables['adaptive_tolerance']
+        self.adaptive_confidence = self.tools.config_variables['adaptive_confidence']
+        self.adaptive_max_samples = self.tools.config_variables['adaptive_max_samples']
+        if self.adaptive_sampling and self.adaptive_max_samples <= 0:
+            raise ValueError('<*> ERROR: Adaptive sampling needs a positive adaptive_max_samples but it is', self.adaptive_max_samples)
+        self.indexes_min_energy = deltas_tables['indexes_min_energy']
+
+        self.calculate_valid_states(deltas_tables)
+
+    def prepare_acceptance_table(self):
+
+        self.distinct_deltas, self.acceptance_table = self.schedule.calculate_acceptance_table(self.deltas)
+
+    def get_acceptance(self, i, rows, moves):
+
+        # the column of each delta is searched only for the proposed moves (there is no column table as big as the deltas table)
+        return self.acceptance_table[i, np.searchsorted(self.distinct_deltas, self.deltas[rows, moves])]
+
+    def get_shared_table_names(self):
+
+        return ['deltas', 'successors', 'valid_states']
+
+    def execute_metropolis(self):
+
+        if self.adaptive_sampling:
+            return self.execute_metropolis_adaptive()
+
+        if self.number_workers > 1:
+            return self.execute_metropolis_parallel()
+
+        if self.step_sweep:
+            return self.execute_metropolis_sweep()
+
+        # the result of each step is an array with the number of times that each state was produced
+        counts_dict = {}
+
+        for step in range(self.initial_step, self.final_step+1):
+
+            time_start = time.time()
+            cpu_start = time.process_time()
+
+            # the final states of all chains are accumulated as a number of times that each state was produced
+            counts = self.empty_counts()
+
+            for batch_start in range(0, self.n_iterations, self.batch_size):
+
+                states = self.calculate_metropolis_batch(step, min(self.batch_size, self.n_iterations - batch_start))
+                counts += self.count_states(states)
+
+            counts_dict[step] = counts
+
+            self.record_step_time(step, time_start, cpu_start)
+            print("<i> Vectorized Metropolis => Step", step, "calculated in", str(datetime.timedelta(seconds=time.time() - time_start)), "(hh:mm:ss)")
+
+        return counts_dict
+
+    def execute_metropolis_adaptive(self):
+
+        counts_dict = {}
+        precision_solution = self.tools.config_variables['precision_solution']
+
+        for step in range(self.initial_step, self.final_step+1):
+
+            time_start = time.time()
+            cpu_start = time.process_time()
+
+            counts = self.empty_counts()
+            successes = 0
+            samples = 0
+
+            while samples < self.adaptive_max_samples:
+
+                batch_chains = min(self.batch_size, self.adaptive_max_samples - samples)
+                states = self.calculate_metropolis_batch(step, batch_chains)
+
+                counts += self.count_states(states)
+                successes += int(np.isin(states, self.indexes_min_energy).sum())
+                samples += batch_chains
+
+                # relative width of the confidence interval of TTS. Without successes the TTS is the default value (it is not an estimation),
+                # so the sampling continues until there is some success or the samples budget is reached
+                tts, tts_low, tts_high = self.tools.calculate_tts_interval(precision_solution, step, successes, samples, self.adaptive_confidence)
+                if successes > 0 and (tts_high - tts_low) / tts < self.adaptive_tolerance:
+                    break
+
+            counts_dict[step] = counts
+
+            self.record_step_time(step, time_start, cpu_start)
+            print("<i> Vectorized Metropolis => Step", step, "calculated with", samples, "samples, TTS", tts, "in [", tts_low, ",", tts_high, "] in", str(datetime.timedelta(seconds=time.time() - time_start)), "(hh:mm:ss)")
+
+        return counts_dict
+
+    def execute_metropolis_sweep(self):
+
+        time_start = time.time()
+
+        counts_dict = self.count_metropolis_shard(self.n_iterations)
+
+        print("<i> Vectorized Metropolis => Steps", self.initial_step, "to", self.final_step, "calculated in", str(datetime.timedelta(seconds=time.time() - time_start)), "(hh:mm:ss)")
+
+        return counts_dict
+
+    def count_metropolis_shard(self, n_chains, seed=None):
+
+        if seed != None: np.random.seed(seed)
+
+        steps = list(range(self.initial_step, self.final_step+1))
+        counts = {step: self.empty_counts() for step in steps}
+
+        # each batch of chains is executed once until the final step (sweep mode) or once per step and the states of all steps are accumulated
+        for batch_start in range(0, n_chains, self.batch_size):
+
+            batch_chains = min(self.batch_size, n_chains - batch_start)
+            if self.step_sweep:
+                states_by_step = self.calculate_metropolis_batch(self.final_step, batch_chains, record_steps=steps)
+            else:
+                states_by_step = {step: self.calculate_metropolis_batch(step, batch_chains) for step in steps}
+
+            for step in steps:
+                counts[step] += self.count_states(states_by_step[step])
+
+        return counts
+
+    def empty_counts(self):
+
+        return np.zeros(self.number_states, dtype=np.int64)
+
+    def count_states(self, states):
+
+        return np.bincount(states, minlength=self.number_states)
+
+    def calculate_metropolis_batch(self, nW, n_chains, fixed_state=0, record_steps=None):
+
+        if self.initialization == 'random':
+            states_old = self.generate_random_states(n_chains)
+        elif self.initialization == 'fixed':
+            states_old = np.full(n_chains, fixed_state, dtype=self.successors.dtype)
+
+        # if record_steps is defined, the states of these steps are returned
+        states_by_step = {}
+        if record_steps != None and 0 in record_steps: states_by_step[0] = states_old
+
+        acceptances = 0
+
+        for i in range(1, nW+1):
+
+            # rows of the deltas and successors tables of the current states
+            rows = self.get_rows(states_old)
+
+            states_new, moves = self.generate_new_states(rows)
+
+            # the probability exp(-beta*Delta_E) (or 1 if the energy goes down) is precalculated for each iteration and delta
+            probability_threshold = self.get_acceptance(i, rows, moves)
+
+            accepted = np.random.random_sample(n_chains) < probability_threshold
+            states_old = np.where(accepted, states_new, states_old)
+            acceptances += int(np.count_nonzero(accepted))
+
+            if record_steps != None and i in record_steps: states_by_step[i] = states_old
+
+        # each proposal is one lookup in the deltas table (there are no invalid moves to retry)
+        proposals = nW * n_chains
+        self.step_counters[nW].update({'proposals': proposals, 'acceptances': acceptances, 'rejections': proposals - acceptances, 'delta_lookups': proposals})
+
+        if record_steps != None: return states_by_step
+
+        return states_old
+
+    def generate_random_states(self, n_chains):
+
+        # a random rank is a random permutation. The states are regenerated until all of them have the fixed queen in its position
+        states = np.random.randint(0, self.number_states, size=n_chains).astype(self.successors.dtype)
+
+        invalid_chains = np.flatnonzero(~self.are_valid_states(states))
+        while len(invalid_chains) > 0:
+            states[invalid_chains] = np.random.randint(0, self.number_states, size=len(invalid_chains))
+            invalid_chains = invalid_chains[~self.are_valid_states(states[invalid_chains])]
+
+        return states
+
+    def are_valid_states(self, states):
+
+        return self.valid_states[states]
+
+    def get_rows(self, states):
+
+        # the tables contain all states, so the row of a state is its rank
+        return states
+
+    def generate_new_states(self, rows):
+
+        # the moves 2*coord + plusminus are chosen with the probabilities of the legal moves
+        # (the moves out of the range are inverted and the moves of the fixed queen are never proposed, so there are no repetitions)
+        moves = np.random.choice(len(self.move_probabilities), size=len(rows), p=self.move_probabilities)
+
+        return self.successors[rows, moves], moves
@@ -0,0 +1,18 @@
+import multiprocessing
+
+# object of the worker process (an engine, a solver or the arguments of the tables). It is sent once to each worker
+# when the pool is created (not with each task), the functions of the tasks read it with get_worker_object
+worker_object = None
+
+def initialize_worker(shared_object):
+
+    global worker_object
+    worker_object = shared_object
+
+def get_worker_object():
+
+    return worker_object
+
+def create_pool(number_workers, shared_object):
+
+    return multiprocessing.Pool(number_workers, initializer=initialize_worker, initargs=(shared_object,))